@@ -1,4 +1,5 @@
 import os
+import json
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
@@ -27,6 +28,9 @@ class StockDetailPage:
             os.path.join(self.data_dir, "day_klines", "sz50_klines.csv"),
             os.path.join(self.data_dir, "day_klines", "zz500_klines.csv")
         ]
+        # 按 code 聚簇的K线 parquet 及其索引（由 scripts/cluster_klines.py 生成）
+        self.clustered_kline_path = os.path.join(self.data_dir, "day_klines", "all_klines.parquet")
+        self.kline_index_path = os.path.join(self.data_dir, "day_klines", "all_klines.index.json")
         self.metrics_path = os.path.join(self.data_dir, "order_book", "metrics.csv")
         self.details_path = os.path.join(self.data_dir, "data_analysis", "details.csv")
         
@@ -40,6 +44,7 @@ class StockDetailPage:
         self.df_m = pd.DataFrame()
         self.df_details = pd.DataFrame()
         self.stock_info = {}
+        self.resampled_cache = {}  # 周期 -> 重采样后的K线，切换周期时复用
 
         self.display_detail()
 
@@ -73,6 +78,27 @@ class StockDetailPage:
             kline_code = code
         return detail_code, kline_code
 
+    def _load_clustered_kline(self, kline_code):
+        """通过聚簇索引只读取该股票所在的 row group，索引不可用时返回空表"""
+        if not (os.path.exists(self.clustered_kline_path) and os.path.exists(self.kline_index_path)):
+            return pd.DataFrame()
+        try:
+            with open(self.kline_index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("file_size") != os.path.getsize(self.clustered_kline_path):
+                print("Debug: K线索引与 parquet 文件不一致，忽略索引")
+                return pd.DataFrame()
+            start, stop = index["codes"].get(kline_code, (0, 0))
+            if start == stop:
+                return pd.DataFrame()
+            import pyarrow.parquet as pq
+            df = pq.ParquetFile(self.clustered_kline_path).read_row_groups(list(range(start, stop))).to_pandas()
+            print(f"Debug: 通过聚簇索引读取 {len(df)} 行数据")
+            return df
+        except Exception as e:
+            print(f"Debug: 读取聚簇K线失败: {e}")
+            return pd.DataFrame()
+
     def display_detail(self):
         # 清空原有内容
         for widget in self.root.winfo_children():
@@ -155,13 +181,15 @@ class StockDetailPage:
     def load_data(self):
         """加载股票数据"""
         try:
+            self.resampled_cache = {}
             # 标准化股票代码
             detail_code, kline_code = self._normalize_stock_code(self.stock_code)
             print(f"Debug: 原始代码={self.stock_code}, 详情格式={detail_code}, K线格式={kline_code}")
             
-            # 在所有K线文件中查找数据
-            self.df_k = pd.DataFrame()
-            for kline_file in self.kline_files:
+            # 优先走聚簇索引，找不到再在所有K线文件中查找数据
+            self.df_k = self._load_clustered_kline(kline_code)
+            kline_files = self.kline_files if self.df_k.empty else []
+            for kline_file in kline_files:
                 if os.path.exists(kline_file):
                     print(f"Debug: 检查文件: {kline_file}")
                     try:
@@ -394,13 +422,16 @@ class StockDetailPage:
         }
         rule = rule_map.get(period, 'D')
 
-        resampled = self.df_k.resample(rule).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        }).dropna()
+        resampled = self.resampled_cache.get(rule)
+        if resampled is None:
+            resampled = self.df_k.resample(rule).agg({
+                'open': 'first',
+                'high': 'max',
+                'low': 'min',
+                'close': 'last',
+                'volume': 'sum'
+            }).dropna()
+            self.resampled_cache[rule] = resampled
 
         mc = mpf.make_marketcolors(
             up='red', down='green',
@@ -110,15 +110,16 @@ class StrategyPage:
         
         # 交易方向分析
         direction_counts = user_trades['direction'].value_counts()
-        summary_text += f"交易方向分布: {dict(direction_counts)}\n"
+        summary_text += f"交易方向分布: {' / '.join(f'{k} {v}' for k, v in direction_counts.items())}\n"
         
         # 盈亏分析
         result_counts = user_trades['result'].value_counts()
-        summary_text += f"盈亏分布: {dict(result_counts)}\n"
+        summary_text += f"盈亏分布: {' / '.join(f'{k} {v}' for k, v in result_counts.items())}\n"
         
-        # 交易的股票代码
-        stock_codes = user_trades['code'].unique()
-        summary_text += f"交易股票: {list(stock_codes)}\n"
+        # 交易的股票代码：只列出交易最频繁的几只，避免整张代码表撑大提示词
+        code_counts = user_trades['code'].value_counts()
+        top_codes = '、'.join(f"{code}({n})" for code, n in code_counts.head(5).items())
+        summary_text += f"交易股票: 共 {len(code_counts)} 只，最常交易 {top_codes}\n"
         
         # 价格区间分析
         if 'price' in user_trades.columns:
@@ -135,7 +136,9 @@ class StrategyPage:
         recent_trades = user_trades.tail(5)
         summary_text += "\n最近5笔交易：\n"
         for _, trade in recent_trades.iterrows():
-            summary_text += f"- {trade.get('time', 'N/A')} {trade.get('code', 'N/A')} {trade.get('direction', 'N/A')} {trade.get('price', 'N/A')} {trade.get('result', 'N/A')}\n"
+            price = pd.to_numeric(trade.get('price'), errors='coerce')
+            price = f"{price:.2f}" if pd.notna(price) else 'N/A'
+            summary_text += f"- {trade.get('time', 'N/A')} {trade.get('code', 'N/A')} {trade.get('direction', 'N/A')} {price} {trade.get('result', 'N/A')}\n"
         
         return summary_text
 
@@ -0,0 +1,73 @@
+"""
+K线存储重排模块
+将 K 线文件按 (code, date) 排序重写，每只股票独占若干 row group，
+并生成 code -> row group 区间的旁路索引，单股查询只读取对应字节。
+
+用法: python cluster_klines.py [源文件] [目标 parquet]
+"""
+import os
+import sys
+import json
+import math
+
+import duckdb
+import pyarrow.parquet as pq
+
+from config import KLINE_SOURCE_PATH, KLINE_PARQUET_PATH
+
+ROW_GROUP_ROWS = 8192  # 单个 row group 最大行数（约 30 年日线）
+INDEX_VERSION = 1
+
+
+def index_path_for(parquet_path):
+    """旁路索引路径: all_klines.parquet -> all_klines.index.json"""
+    return os.path.splitext(parquet_path)[0] + '.index.json'
+
+
+def cluster_klines(src, dst, row_group_rows=ROW_GROUP_ROWS):
+    """按 code 聚簇重写 K 线文件，返回索引字典"""
+    reader = 'read_csv_auto' if src.lower().endswith('.csv') else 'read_parquet'
+    con = duckdb.connect()
+    klines = con.execute(
+        f"SELECT * FROM {reader}(?) ORDER BY code, date", [src]
+    ).fetch_arrow_table()
+    con.register('klines', klines)
+    counts = con.execute(
+        "SELECT code, count(*) FROM klines GROUP BY code ORDER BY code"
+    ).fetchall()
+    con.close()
+
+    codes = {}
+    tmp = dst + '.tmp'
+    offset, row_group = 0, 0
+    with pq.ParquetWriter(tmp, klines.schema, compression='zstd') as writer:
+        for code, n in counts:
+            writer.write_table(klines.slice(offset, n), row_group_size=row_group_rows)
+            groups = math.ceil(n / row_group_rows)
+            codes[code] = [row_group, row_group + groups]
+            offset += n
+            row_group += groups
+
+    if pq.ParquetFile(tmp).metadata.num_row_groups != row_group:
+        os.remove(tmp)
+        raise RuntimeError('row group 数量与索引不一致')
+
+    os.replace(tmp, dst)
+    index = {
+        'version': INDEX_VERSION,
+        'file_size': os.path.getsize(dst),
+        'rows': klines.num_rows,
+        'codes': codes,
+    }
+    idx_path = index_path_for(dst)
+    with open(idx_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(idx_path + '.tmp', idx_path)
+    return index
+
+
+if __name__ == '__main__':
+    src = sys.argv[1] if len(sys.argv) > 1 else KLINE_SOURCE_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else KLINE_PARQUET_PATH
+    index = cluster_klines(src, dst)
+    print(f"写入 {dst}: {index['rows']} 行, {len(index['codes'])} 只股票")
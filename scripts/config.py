@@ -9,6 +9,8 @@ from datetime import datetime
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DATA_PATH = os.path.join(BASE_DIR, 'data/day_klines/sz50_klines.csv')  # 你的CSV文件路径
 OUTPUT_DIR = os.path.join(BASE_DIR, 'data/data_analysis')
+KLINE_SOURCE_PATH = os.path.join(BASE_DIR, 'data/day_klines/all_klines.csv')  # 全市场K线
+KLINE_PARQUET_PATH = os.path.join(BASE_DIR, 'data/day_klines/all_klines.parquet')  # 按 code 聚簇后的K线
 
 # 回测参数
 BACKTEST_START = datetime(2020, 1, 1)
@@ -15,65 +15,102 @@ def load_data():
     return df
 
 
-def calculate_metrics(data):
+def segment_metrics(codes, returns, rf=0.03, periods=252):
     """
-    核心指标计算
+    分段归约计算各股票的年化收益率、最大回撤、夏普比率与索提诺比率。
+    codes 与 returns 为按 code 分组连续排列（组内按日期升序）的一维数组，
+    用相邻 code 变化的位置作为分段边界，一次性对全部股票做向量化计算；
+    returns 中的 NaN（每只股票首日等）不参与计算，口径与逐只股票用 pandas 计算一致。
     """
-
-    metrics = []
-    for code, group in data.groupby('code'):
-        # 年化收益率
-        annual_return = (1 + group['returns']).prod() ** (252/len(group)) - 1
-
-        # 最大回撤
-        cumulative = (1 + group['returns']).cumprod()
-        peak = cumulative.expanding().max()
-        max_dd = (cumulative / peak - 1).min()
-
-
-        # 添加到结果集
-        metrics.append({
-            'code': code,
-            'annual_return': annual_return,
-            'max_drawdown': max_dd,
-            'sharpe': (annual_return - 0.03) / (group['returns'].std() * np.sqrt(252))
-        })
+    codes = np.asarray(codes)
+    r = np.asarray(returns, dtype=float)
+    n = len(r)
+    if n == 0:
+        return pd.DataFrame(columns=['code', 'annual_return', 'max_drawdown', 'sharpe', 'sortino'])
+
+    # 分段边界：starts[k] 为第 k 只股票的首行
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    invalid = np.isnan(r)
+    valid = ~invalid
+    n_valid = np.add.reduceat(valid, starts, dtype=np.int64)
+    rz = np.where(valid, r, 0.0)
+
+    # 年化收益率：按总行数年化（与原实现一致，首日 NaN 也计入天数）
+    cum = rz + 1.0
+    growth = np.multiply.reduceat(cum, starts)
+    annual_return = growth ** (periods / lengths) - 1
+
+    # 最大回撤：对数净值累加后减去段内最小值，再加上逐段递增的偏移量，
+    # 使一次 maximum.accumulate 就能得到各段内部的历史最高点
+    np.maximum(cum, np.finfo(float).tiny, out=cum)
+    np.log(cum, out=cum)
+    np.cumsum(cum, out=cum)
+    with np.errstate(invalid='ignore'):
+        cum -= np.repeat(np.minimum.reduceat(cum, starts), lengths)
+        span = np.max(cum) + 1.0
+        cum += np.repeat(np.arange(len(starts)) * span, lengths)
+        cum[invalid] = -np.inf  # 净值从首个有效收益开始计，NaN 行不作为高点
+        drawdown = np.maximum.accumulate(cum)
+        np.subtract(cum, drawdown, out=drawdown)
+    drawdown[invalid] = 0.0
+    max_drawdown = np.expm1(np.minimum.reduceat(drawdown, starts))  # expm1 单调，先取最小值再换算
+    max_drawdown[n_valid == 0] = np.nan
+
+    def segment_std(x, count):
+        """
+        分段样本标准差（ddof=1），只统计 count 行有效数据，x 在其余行为 0；
+        其余行对离差平方和的贡献恰为 mean²，直接扣除，省去一次掩码赋值。
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.add.reduceat(x, starts) / count
+            dev = x - np.repeat(mean, lengths)
+            np.square(dev, out=dev)
+            ss = np.add.reduceat(dev, starts) - (lengths - count) * mean ** 2
+            var = np.maximum(ss, 0.0) / (count - 1)
+        var[count < 2] = np.nan
+        return np.sqrt(var)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 夏普比率：年化波动率为 0 时记为 NaN
+        returns_std = segment_std(rz, n_valid) * np.sqrt(periods)
+        sharpe = np.where(returns_std != 0, (annual_return - rf) / returns_std, np.nan)
+
+        # 索提诺比率：只统计超额收益为负的交易日
+        downside = valid & (rz < rf)
+        downside_count = np.add.reduceat(downside, starts, dtype=np.int64)
+        downside_std = segment_std(np.where(downside, rz, 0.0), downside_count)
+        downside_std = np.where(downside_count == 0, 0.0, downside_std * np.sqrt(periods))
+        sortino = np.where(downside_std != 0, (annual_return - rf) / downside_std, np.nan)
+
+    return pd.DataFrame({
+        'code': codes[starts],
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'sharpe': sharpe,
+        'sortino': sortino,
+    })
 
 
 def calculate_metrics(data):
-    """核心指标计算（新增索提诺比率）"""
-    metrics = []
+    """核心指标计算（年化收益率、最大回撤、夏普比率、索提诺比率）"""
     rf = 0.03  # 无风险利率
 
-    for code, group in data.groupby('code'):
-        # 年化收益率计算
-        cumulative_return = (1 + group['returns']).prod()
-        annual_return = cumulative_return ** (252 / len(group)) - 1
-
-        # 最大回撤计算
-        cumulative = (1 + group['returns']).cumprod()
-        peak = cumulative.expanding().max()
-        max_dd = (cumulative / peak - 1).min()
-
-        # 夏普比率计算
-        returns_std = group['returns'].std() * np.sqrt(252)  # 年化波动率
-        sharpe = (annual_return - rf) / returns_std if returns_std != 0 else np.nan
-
-        # 索提诺比率计算（新增部分）
-        excess_returns = group['returns'] - rf
-        downside_returns = excess_returns[excess_returns < 0]
-        downside_std = downside_returns.std() * np.sqrt(252) if not downside_returns.empty else 0
-        sortino = (annual_return - rf) / downside_std if downside_std != 0 else np.nan
-
-        metrics.append({
-            'code': code,
-            'annual_return': annual_return,
-            'max_drawdown': max_dd,
-            'sharpe': sharpe,
-            'sortino': sortino  # 新增指标
-        })
-
-    return pd.DataFrame(metrics)
+    # 先把 code 编码为按字典序排列的整数，分段比较比逐个比较字符串快得多；
+    # 同一 code 的行不连续时稳定排序，保持组内原有的日期顺序
+    ids, uniques = pd.factorize(data['code'], sort=True)
+    returns = data['returns'].to_numpy(dtype=float)
+    # code 为 NaN 的行编码为 -1，与 groupby 一致直接丢弃
+    keep = ids >= 0
+    if not keep.all():
+        ids, returns = ids[keep], returns[keep]
+    if len(ids) > 1 and (np.diff(ids) < 0).any():
+        order = np.argsort(ids, kind='stable')
+        ids, returns = ids[order], returns[order]
+    result = segment_metrics(ids, returns, rf=rf)
+    result['code'] = np.asarray(uniques)[result['code'].to_numpy()]
+    return result
+
 
 def momentum_strategy(data, lookback=60):
     """动量策略实现"""
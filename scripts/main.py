@@ -1,6 +1,8 @@
 """
 主执行模块
 """
+import time
+
 from core import *
 from visualization import *
 import config
@@ -9,8 +11,10 @@ if __name__ == '__main__':
     # 数据加载
     raw_data = load_data()
 
-    # 计算核心指标
+    # 计算核心指标（全部股票一次性分段向量化计算）
+    start = time.perf_counter()
     metrics_df = calculate_metrics(raw_data)
+    print(f"核心指标: {len(metrics_df)} 只股票, {len(raw_data)} 行, 耗时 {time.perf_counter() - start:.3f}s")
     metrics_df.to_csv(f'{config.OUTPUT_DIR}/stock_metrics.csv')
 
     # 执行动量策略
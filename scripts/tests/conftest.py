@@ -0,0 +1,5 @@
+import os
+import sys
+
+# scripts 下的模块以 `from config import *` 互相引用，需把 scripts 目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
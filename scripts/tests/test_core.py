@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import calculate_metrics, segment_metrics
+
+COLUMNS = ['code', 'annual_return', 'max_drawdown', 'sharpe', 'sortino']
+
+
+def reference_metrics(data):
+    """原逐只股票 groupby 实现，作为向量化版本的对照。"""
+    metrics = []
+    rf = 0.03
+    for code, group in data.groupby('code'):
+        cumulative_return = (1 + group['returns']).prod()
+        annual_return = cumulative_return ** (252 / len(group)) - 1
+        cumulative = (1 + group['returns']).cumprod()
+        peak = cumulative.expanding().max()
+        max_dd = (cumulative / peak - 1).min()
+        returns_std = group['returns'].std() * np.sqrt(252)
+        sharpe = (annual_return - rf) / returns_std if returns_std != 0 else np.nan
+        excess_returns = group['returns'] - rf
+        downside_returns = excess_returns[excess_returns < 0]
+        downside_std = downside_returns.std() * np.sqrt(252) if not downside_returns.empty else 0
+        sortino = (annual_return - rf) / downside_std if downside_std != 0 else np.nan
+        metrics.append({'code': code, 'annual_return': annual_return, 'max_drawdown': max_dd,
+                        'sharpe': sharpe, 'sortino': sortino})
+    return pd.DataFrame(metrics, columns=COLUMNS)
+
+
+def make_data(seed=0, n_codes=30, max_len=300):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(n_codes):
+        n = int(rng.integers(1, max_len))
+        returns = rng.normal(0.0005, 0.02, n)
+        returns[0] = np.nan  # 首日收益率为 NaN
+        returns[rng.random(n) < 0.02] = np.nan
+        frames.append(pd.DataFrame({
+            'code': f'sh.{600000 + i}',
+            'date': pd.date_range('2020-01-01', periods=n),
+            'returns': returns,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def assert_matches_reference(result, data):
+    expected = reference_metrics(data)
+    assert list(result['code']) == list(expected['code'])
+    for col in COLUMNS[1:]:
+        np.testing.assert_allclose(result[col], expected[col], rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_groupby_loop(seed):
+    data = make_data(seed)
+    assert_matches_reference(calculate_metrics(data), data)
+
+
+def test_non_contiguous_codes_keep_date_order():
+    data = make_data(3, n_codes=8)
+    shuffled = data.sample(frac=1, random_state=0).sort_values('date', kind='stable')
+    assert_matches_reference(calculate_metrics(shuffled), shuffled)
+
+
+def test_nan_codes_are_dropped():
+    data = make_data(4, n_codes=5)
+    with_nan = data.copy()
+    with_nan.loc[with_nan.index[::7], 'code'] = np.nan
+    result = calculate_metrics(with_nan)
+    assert not result['code'].duplicated().any()
+    assert result['code'].notna().all()
+    assert_matches_reference(result, with_nan.dropna(subset=['code']))
+
+
+def test_all_nan_and_single_row_segments():
+    data = pd.DataFrame({
+        'code': ['a', 'b', 'b', 'c'],
+        'returns': [np.nan, np.nan, np.nan, 0.01],
+    })
+    result = calculate_metrics(data).set_index('code')
+    assert np.isnan(result.loc['b', 'max_drawdown'])
+    assert np.isnan(result.loc['c', 'sharpe'])
+    assert_matches_reference(calculate_metrics(data), data)
+
+
+@pytest.mark.parametrize('value', [0.0, 0.001, -0.002])
+def test_constant_returns_give_nan_ratios(value):
+    # 收益率恒定时波动率为 0：原实现因浮点误差可能得到 ±1e14 量级的比率，现在统一记为 NaN
+    data = pd.DataFrame({'code': 'a', 'returns': [np.nan] + [value] * 50})
+    result = calculate_metrics(data).iloc[0]
+    assert result['annual_return'] == pytest.approx((1 + value) ** (50 * 252 / 51) - 1)
+    assert np.isnan(result['sharpe'])
+    assert np.isnan(result['sortino'])
+
+
+def test_empty_input():
+    result = segment_metrics(np.array([]), np.array([]))
+    assert list(result.columns) == COLUMNS
+    assert result.empty
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional
+
+from . import metrics
+
+# 优先级：数值越小越先调度。个股对话为交互式短请求，策略分析为长请求
+PRIORITY_STOCK = 0
+PRIORITY_STRATEGY = 1
+PRIORITY_NAMES = ("stock", "strategy")
+
+# 通过环境变量调整：LLM_MAX_IN_FLIGHT / LLM_MAX_QUEUE / LLM_MAX_QUEUE_PER_USER / LLM_MAX_WAIT
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+MAX_QUEUE_PER_USER = int(os.getenv("LLM_MAX_QUEUE_PER_USER", "8"))
+MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", "15"))
+
+
+class Overloaded(Exception):
+    """排队已满或等待超时，调用方应返回 429 并带上 Retry-After（秒）。"""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Slot:
+    """一个上游并发名额，release 可重复调用；对象被回收时若仍未释放则自动归还。"""
+
+    def __init__(self, controller: "AdmissionController") -> None:
+        self._controller = controller
+        self._loop = asyncio.get_running_loop()
+        self._start = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(time.monotonic() - self._start)
+
+    def __del__(self) -> None:
+        # 流在开始迭代前客户端就断开时，生成器的 finally 不会执行，由这里兜底
+        if not self._released and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.release)
+
+
+class _Waiter:
+    __slots__ = ("future", "user", "priority", "enqueued")
+
+    def __init__(self, future: asyncio.Future, user: Hashable, priority: int) -> None:
+        self.future = future
+        self.user = user
+        self.priority = priority
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    """
+    上游 LLM 请求的准入控制：
+    并发数达到上限后进入等待队列，先按优先级、同一优先级内按用户轮转出队，
+    避免单个用户的突发请求占满队列；总队列或单用户队列已满、等待超时时快速拒绝。
+    必须在事件循环线程中使用。
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_queue: int = MAX_QUEUE,
+        max_queue_per_user: int = MAX_QUEUE_PER_USER,
+        max_wait: float = MAX_WAIT,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.max_wait = max_wait
+        self.in_flight = 0
+        # 每个优先级一个 用户 → 等待者队列 的有序字典，字典顺序即轮转顺序
+        self._queues: List["OrderedDict[Hashable, Deque[_Waiter]]"] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._queued = [0] * len(PRIORITY_NAMES)
+        self._per_user: Dict[Hashable, int] = {}
+        self._waits: Deque[float] = deque(maxlen=1024)
+        self._avg_hold = 10.0  # 名额占用时长的指数滑动平均（秒），用于估算 Retry-After
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(self._queued)
+
+    def retry_after(self) -> int:
+        """按排队长度与平均占用时长估算需要等待的秒数。"""
+        return max(1, min(60, math.ceil(self._avg_hold * (self.queued + 1) / self.max_in_flight)))
+
+    async def acquire(self, user: Hashable, priority: int = PRIORITY_STOCK) -> Slot:
+        if self.in_flight < self.max_in_flight and not self.queued:
+            return self._grant(0.0)
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("queue_full", self.retry_after())
+        if self._per_user.get(user, 0) >= self.max_queue_per_user:
+            self.rejected += 1
+            raise Overloaded("user_queue_full", self.retry_after())
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), user, priority)
+        self._queues[priority].setdefault(user, deque()).append(waiter)
+        self._queued[priority] += 1
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+        self.queued_total += 1
+        try:
+            return await asyncio.wait_for(waiter.future, self.max_wait)
+        except asyncio.TimeoutError:
+            # 超时与分配名额同时发生时，名额已经给出，须交还给下一个等待者
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            self._discard(waiter)
+            self.timeouts += 1
+            raise Overloaded("wait_timeout", self.retry_after()) from None
+        except asyncio.CancelledError:
+            # 已分配到名额后才被取消时，把名额交还给下一个等待者
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            self._discard(waiter)
+            raise
+
+    def _grant(self, waited: float) -> Slot:
+        self.in_flight += 1
+        self.admitted += 1
+        self._waits.append(waited)
+        return Slot(self)
+
+    def _release(self, held: float) -> None:
+        self.in_flight -= 1
+        self._avg_hold = 0.9 * self._avg_hold + 0.1 * held
+        while self.in_flight < self.max_in_flight:
+            waiter = self._pop_next()
+            if waiter is None:
+                break
+            if waiter.future.done():
+                continue
+            waiter.future.set_result(self._grant(time.monotonic() - waiter.enqueued))
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        for priority, users in enumerate(self._queues):
+            if not users:
+                continue
+            user, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            self._dequeued(waiter)
+            return waiter
+        return None
+
+    def _discard(self, waiter: _Waiter) -> None:
+        waiters = self._queues[waiter.priority].get(waiter.user)
+        if not waiters or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self._queues[waiter.priority][waiter.user]
+        self._dequeued(waiter)
+
+    def _dequeued(self, waiter: _Waiter) -> None:
+        self._queued[waiter.priority] -= 1
+        left = self._per_user[waiter.user] - 1
+        if left:
+            self._per_user[waiter.user] = left
+        else:
+            del self._per_user[waiter.user]
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 2)
+
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": dict(zip(PRIORITY_NAMES, self._queued)),
+            "queued_users": len(self._per_user),
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99), "max": pct(100)},
+            "avg_hold_s": round(self._avg_hold, 3),
+            "retry_after_s": self.retry_after(),
+        }
+
+
+# 全局实例，所有聊天路由共享
+ADMISSION = AdmissionController()
+metrics.register("llm_admission", ADMISSION.stats)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow.parquet as pq
+
+from . import metrics
+from .db import POOL, DuckDBPool, file_version
+
+DATA_DIR = "data"
+
+# 视图名 -> (相对 DATA_DIR 的路径, 主键列候选名，按优先级)
+DATASETS: Dict[str, Tuple[str, Sequence[str]]] = {
+    "all_klines": (os.path.join("day_klines", "all_klines.parquet"), ("code", "证券代码", "stock_code")),
+    "details": (os.path.join("data_analysis", "details.parquet"), ("证券代码", "code", "股票代码", "stock_code")),
+    "order_book": (os.path.join("order_book", "order_book.parquet"), ("user",)),
+    "user_summary": (os.path.join("order_book", "user_summary.parquet"), ("user",)),
+}
+
+
+def match_col(cols: Sequence[str], candidates: Sequence[str]) -> Optional[str]:
+    """按候选顺序大小写不敏感地匹配列名，返回实际列名。"""
+    lowered = {c.lower(): c for c in reversed(list(cols))}
+    for c in candidates:
+        real = lowered.get(c.lower())
+        if real is not None:
+            return real
+    return None
+
+
+@dataclass(frozen=True)
+class DatasetInfo:
+    name: str
+    path: str
+    version: str
+    columns: Dict[str, str] = field(default_factory=dict)  # 列名 -> Arrow 类型
+    key: Optional[str] = None                                # 解析后的主键列
+    num_rows: int = 0
+    # 每个 row group 的 (行数, {列名: (min, max)})，统计缺失的列不出现
+    row_groups: List[Tuple[int, Dict[str, Tuple[Any, Any]]]] = field(default_factory=list)
+
+
+def _row_group_stats(metadata: pq.FileMetaData) -> List[Tuple[int, Dict[str, Tuple[Any, Any]]]]:
+    groups = []
+    for i in range(metadata.num_row_groups):
+        rg = metadata.row_group(i)
+        stats = {}
+        for j in range(rg.num_columns):
+            col = rg.column(j)
+            s = col.statistics
+            if s is not None and s.has_min_max:
+                stats[col.path_in_schema] = (s.min, s.max)
+        groups.append((rg.num_rows, stats))
+    return groups
+
+
+class Catalog:
+    """
+    数据集目录：启动时把各 parquet 注册为共享连接上的同名视图，
+    并缓存 schema、主键列与 row group 统计。
+    访问时只做一次 os.stat，文件变化则重新读取 footer 并 CREATE OR REPLACE VIEW 原子替换。
+    """
+
+    def __init__(self, pool: DuckDBPool, data_dir: str = DATA_DIR) -> None:
+        self.pool = pool
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._infos: Dict[str, DatasetInfo] = {}
+        self.swaps = 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.data_dir, DATASETS[name][0])
+
+    def _register(self, name: str, version: str) -> DatasetInfo:
+        path = self.path(name)
+        metadata = pq.read_metadata(path)
+        schema = metadata.schema.to_arrow_schema()
+        columns = {f.name: str(f.type) for f in schema}
+        info = DatasetInfo(
+            name=name,
+            path=path,
+            version=version,
+            columns=columns,
+            key=match_col(list(columns), DATASETS[name][1]),
+            num_rows=metadata.num_rows,
+            row_groups=_row_group_stats(metadata),
+        )
+        literal = path.replace("'", "''")
+        with self.pool.cursor() as cur:
+            cur.execute(f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet('{literal}')")
+        self.swaps += 1
+        return info
+
+    def get(self, name: str) -> DatasetInfo:
+        """返回最新的数据集信息（文件变化时先替换视图）；文件不存在时抛出 FileNotFoundError。"""
+        version = file_version(self.path(name))
+        if version == "missing":
+            raise FileNotFoundError(self.path(name))
+        info = self._infos.get(name)
+        if info is not None and info.version == version:
+            return info
+        with self._lock:
+            info = self._infos.get(name)
+            if info is None or info.version != version:
+                info = self._infos[name] = self._register(name, version)
+        return info
+
+    def view(self, name: str) -> str:
+        """确保视图为最新并返回视图名，可直接拼进 SQL。"""
+        return self.get(name).name
+
+    def key(self, name: str) -> Optional[str]:
+        return self.get(name).key
+
+    def startup(self) -> None:
+        """注册所有存在的数据集，缺失的文件在首次访问时再注册。"""
+        for name in DATASETS:
+            try:
+                self.get(name)
+            except (FileNotFoundError, OSError) as e:
+                print(f"[WARN] 数据集 {name} 暂不可用: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "swaps": self.swaps,
+            "datasets": {
+                name: {
+                    "path": info.path,
+                    "version": info.version,
+                    "key": info.key,
+                    "rows": info.num_rows,
+                    "row_groups": len(info.row_groups),
+                    "columns": len(info.columns),
+                }
+                for name, info in self._infos.items()
+            },
+        }
+
+
+# 全局数据集目录，视图注册在 POOL 的共享连接上
+CATALOG = Catalog(POOL)
+metrics.register("catalog", CATALOG.stats)
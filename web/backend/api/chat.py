@@ -1,64 +1,100 @@
 from __future__ import annotations
-from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Sequence
 
 import re
-import json
-import duckdb
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-
-from .deepseek import DeepSeekClient
-
-# ---------- 文件路径 ----------
-DATA_DIR = Path("data")
-DETAILS_PATH = DATA_DIR / "data_analysis" / "details.parquet"
-KLINE_PATH = DATA_DIR / "day_klines" / "all_klines.parquet"
-ORDER_PATH = DATA_DIR / "order_book" / "order_book.parquet"
-USER_SUMMARY_PATH = DATA_DIR / "order_book" / "user_summary.parquet"
-
-# 全局 DuckDB 连接
-CON = duckdb.connect(database=":memory:", read_only=False)
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+from .admission import ADMISSION, PRIORITY_STOCK, PRIORITY_STRATEGY, Overloaded, Slot
+from .catalog import CATALOG, DATASETS, match_col
+from .conversations import CONVERSATION_ID, store_from_env
+from .context_encoder import STATS as CONTEXT_STATS, encode_stock_context, encode_strategy_context
+from .db import POOL, file_version
+from .deepseek import COMPLETIONS, DeepSeekClient
+from .kline import KLINES
+from .lru import VersionedLRU
+from .singleflight import FLIGHTS
+from .sse import coalesce
+from .stocks import DETAILS, YEAR_FILTER
 
 router = APIRouter()
 
-
-# ---------- 工具函数 ----------
-def _detect_col(path: Path, candidates: list[str]) -> str | None:
-    """从 parquet header 中找出真实列名（大小写匹配）。"""
-    cols = CON.execute(
-        f"SELECT * FROM read_parquet('{path.as_posix()}') LIMIT 0"
-    ).fetchdf().columns.tolist()
-    for c in candidates:
-        for real in cols:
-            if real.lower() == c.lower():
-                return real  # 返回实际列名，保持大小写
-    return None
+# 上下文缓存：键为请求参数，版本为相关数据文件的版本，数据更新后自动失效
+STOCK_CONTEXTS = VersionedLRU(maxsize=256, ttl=600)
+STRATEGY_CONTEXTS = VersionedLRU(maxsize=256, ttl=120)
+metrics.register("stock_context", STOCK_CONTEXTS.stats)
+metrics.register("strategy_context", STRATEGY_CONTEXTS.stats)
+metrics.register("context_tokens", CONTEXT_STATS.stats)
+# 服务端会话：带 conversation_id 的请求只需发送新消息，历史与滚动摘要由服务端维护
+CONVERSATIONS = store_from_env()
+metrics.register("conversations", CONVERSATIONS.stats)
+if COMPLETIONS is not None:
+    metrics.register("completion_cache", COMPLETIONS.stats)
 
 
-def _read_filter_df(
-    path: Path,
-    key_val: str,
-    key_candidates: list[str],
-    extra_sql: str = "",
-):
+# ---------- 工具函数 ----------
+def _read_filter_df(name: str, key_val: str, extra_sql: str = "", extra_params: Sequence[Any] = ()):
     """
-    读取 parquet → DataFrame，按 key 列筛选。
-    自动大小写匹配列名，避免 Binder Error。
+    按主键列筛选 catalog 视图 → DataFrame。
+    主键列在注册视图时已按候选名解析，这里不再额外读取文件头。
+    extra_sql 中的占位符按顺序取 extra_params。
     """
-    key_col = _detect_col(path, key_candidates)
-    if key_col is None:
-        print(f"[WARN] {path.name} 中找不到列名 {tuple(key_candidates)}")
+    info = CATALOG.get(name)
+    if info.key is None:
+        print(f"[WARN] {name} 中找不到列名 {tuple(DATASETS[name][1])}")
         import pandas as pd
         return pd.DataFrame()  # type: ignore
 
     # 使用 lower() 消除大小写 + 引号问题
-    query = (
-        f"SELECT * FROM read_parquet('{path.as_posix()}') "
-        f"WHERE lower({key_col}) = lower(?) {extra_sql}"
-    )
-    return CON.execute(query, [key_val]).fetchdf()
+    query = f'SELECT * FROM {info.name} WHERE lower("{info.key}") = lower(?) {extra_sql}'
+    return POOL.fetchdf(query, [key_val, *extra_params])
+
+
+def _strategy_profile(user_id: str) -> Dict[str, Any]:
+    """一次聚合查询统计该用户全部订单的方向 / 盈亏分布与各标的笔数，不把订单读进内存。"""
+    info = CATALOG.get("order_book")
+    if info.key is None:
+        return {}
+    row = POOL.fetchall(
+        "SELECT count(*), count_if(direction = 'buy'), count_if(direction = 'sell'), "
+        "count_if(result = 'win'), count_if(result = 'lose'), map_entries(histogram(code)) "
+        f'FROM {info.name} WHERE lower("{info.key}") = lower(?)',
+        [user_id],
+    )[0]
+    profile: Dict[str, Any] = {k: v or 0 for k, v in zip(("orders", "buy", "sell", "win", "lose"), row)}
+    profile["codes"] = {e["key"]: e["value"] for e in row[5] or []}
+    return profile
+
+
+def _read_details(detail_code: str, year: Optional[str] = None):
+    """从 details 内存快照中筛选某只股票（可选年份），列名直接取自快照 schema。"""
+    table = DETAILS.get()
+    key_col = match_col(table.column_names, DATASETS["details"][1])
+    if key_col is None:
+        print("[WARN] details 中找不到证券代码列")
+        import pandas as pd
+        return pd.DataFrame()  # type: ignore
+
+    query = f'SELECT * FROM details WHERE lower("{key_col}") = lower(?)'
+    params = [detail_code]
+    if year:
+        query += f" AND {YEAR_FILTER}"
+        params.append(str(year))
+    return POOL.fetchdf(query, params, tables={"details": table})
+
+
+def _read_kline_tail(kline_code: str, rows: int):
+    """读取某只股票最近 rows 根 K 线（时间降序），优先走聚簇索引。"""
+    bars = KLINES.lookup([kline_code])
+    if bars is None:
+        return _read_filter_df(
+            "all_klines", kline_code,
+            extra_sql=f'ORDER BY date DESC LIMIT {rows}'
+        )
+    return bars.to_pandas().sort_values("date", ascending=False).head(rows)
 
 
 # --------- 代码互转（000001.SZ ↔ sz.000001） ---------
@@ -78,23 +114,25 @@ def _to_detail_code(kline_code: str) -> str:
 
 
 # ---------- 构造上下文 ----------
+def _dataset_version(*names: str) -> str:
+    return "|".join(file_version(CATALOG.path(n)) for n in names)
+
+
 def _build_stock_context(stock_id: str, year: str = None, kline_rows: int = 60) -> str:
+    """同一股票 / 年份 / K 线根数的上下文在数据未更新时直接复用。"""
+    return STOCK_CONTEXTS.get_or_build(
+        (stock_id, year, kline_rows), _dataset_version("details", "all_klines"),
+        _render_stock_context, stock_id, year, kline_rows,
+    )
+
+
+def _render_stock_context(stock_id: str, year: str = None, kline_rows: int = 60) -> str:
     try:
         detail_code = stock_id
         kline_code = _to_kline_code(stock_id)
 
-        year_filter = f"AND 年份 = '{year}'" if year else ""
-        
-        details_df = _read_filter_df(
-            DETAILS_PATH, detail_code,
-            key_candidates=["证券代码", "code", "股票代码", "stock_code"],
-            extra_sql=year_filter
-        )
-        kline_df = _read_filter_df(
-            KLINE_PATH, kline_code,
-            key_candidates=["code", "证券代码", "stock_code"],
-            extra_sql=f'ORDER BY date DESC LIMIT {kline_rows}'
-        )
+        details_df = _read_details(detail_code, year)
+        kline_df = _read_kline_tail(kline_code, kline_rows)
 
         if details_df.empty:
             print(f"[WARN] 股票详情中找不到代码: {detail_code}")
@@ -103,53 +141,37 @@ def _build_stock_context(stock_id: str, year: str = None, kline_rows: int = 60)
             print(f"[WARN] K线数据中找不到代码: {kline_code}")
             return ""
 
-        r = details_df.iloc[0]
-        ctx = [
-            f"【{stock_id} 基础概况】",
-            f"名称: {r.get('证券名称', r.get('name', ''))}",
-            f"年份: {r['年份']}  年涨跌幅: {r['年涨跌幅']}%  最大回撤: {r['最大回撤']}%",
-            f"市盈率: {r['市盈率']}  市净率: {r['市净率']}  夏普比率: {r['夏普比率-普通收益率-日-一年定存利率']}",
-            "",
-            f"【最近 {kline_rows} 根 K 线（最新在后）】",
-        ]
-        for _, k in kline_df.iloc[::-1].iterrows():  # 时间升序
-            ctx.append(
-                f"{k['date']} | 开:{k['open']} 收:{k['close']} "
-                f"高:{k['high']} 低:{k['low']}"
-            )
-        return "\n".join(ctx)
+        text, _ = encode_stock_context(
+            stock_id, details_df.iloc[0].to_dict(), kline_df, max_rows=kline_rows
+        )
+        return text
 
     except Exception as e:
         print(f"[chat._build_stock_context] 读取股票数据失败: {e}")
         return ""
 
 def _build_strategy_context(user_id: str, recent: int = 10) -> str:
+    return STRATEGY_CONTEXTS.get_or_build(
+        (user_id, recent), _dataset_version("order_book", "user_summary"),
+        _render_strategy_context, user_id, recent,
+    )
+
+
+def _render_strategy_context(user_id: str, recent: int = 10) -> str:
     try:
-        orders_df = _read_filter_df(
-            ORDER_PATH, user_id, key_candidates=["user"],
-            extra_sql=f'ORDER BY time DESC LIMIT {recent}'
-        )
-        summary_df = _read_filter_df(
-            USER_SUMMARY_PATH, user_id, key_candidates=["user"]
-        )
+        # 分布统计在 DuckDB 中聚合，成交表只取最近 recent 笔
+        profile = _strategy_profile(user_id)
+        orders_df = _read_filter_df("order_book", user_id, "ORDER BY time DESC LIMIT ?", [recent])
+        summary_df = _read_filter_df("user_summary", user_id)
 
         if orders_df.empty or summary_df.empty:
             print(f"[WARN] 用户 {user_id} 的订单或汇总为空")
             return ""
 
-        s = summary_df.iloc[0]
-        ctx = [
-            f"【用户 {user_id} 汇总】",
-            f"总交易笔数: {s['trades']}  总收益率: {s['returnRate']}%  胜率: {s['winRate']}%",
-            "",
-            f"【最近 {recent} 笔交易】",
-        ]
-        for _, o in orders_df.iloc[::-1].iterrows():
-            ctx.append(
-                f"{o['time']} | {o['code']} | {o['direction']} | "
-                f"{o['price']} | {o['result']}"
-            )
-        return "\n".join(ctx)
+        text, _ = encode_strategy_context(
+            user_id, summary_df.iloc[0].to_dict(), profile, orders_df, max_rows=recent
+        )
+        return text
     except Exception as e:
         print(f"[chat._build_strategy_context] 读取用户交易数据失败: {e}")
         return ""
@@ -161,34 +183,96 @@ class ChatRequest(BaseModel):
     history: List[Dict] = []
     stock_id: Optional[str] = None  # 股票或用户 ID
     year: Optional[str] = None  # 年份
+    conversation_id: Optional[str] = None  # 服务端会话 ID，提供时忽略 history
+
+
+def _client_key(request: Request) -> str:
+    """排队公平性按用户区分：优先取 X-User-Id 请求头，否则按客户端地址。"""
+    return request.headers.get("X-User-Id") or (request.client.host if request.client else "")
+
+
+def _overloaded(exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        {"error": "AI 服务繁忙，请稍后重试", "reason": exc.reason},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _invalid_conversation(req: ChatRequest) -> Optional[JSONResponse]:
+    if req.conversation_id is not None and not CONVERSATION_ID.match(req.conversation_id):
+        return JSONResponse({"error": "conversation_id 格式错误"}, status_code=400)
+    return None
+
+
+async def _load_history(req: ChatRequest, kind: str) -> List[Dict]:
+    """有会话 ID 时从服务端存储读取历史，否则沿用客户端上传的最近 6 条。"""
+    if req.conversation_id is None:
+        return (req.history or [])[-6:]
+    return await run_in_threadpool(CONVERSATIONS.history, req.conversation_id, kind, req.stock_id or "")
 
 
 def _stream_response(
-    client: DeepSeekClient, req: ChatRequest, sys_ctx: str = ""
+    client: DeepSeekClient, req: ChatRequest, sys_ctx: str = "", slot: Optional[Slot] = None,
+    history: Optional[List[Dict]] = None,
 ) -> StreamingResponse:
-    history = (req.history or [])[-6:]
+    history = list(history or [])
     if sys_ctx:
         history.append({"role": "system", "content": sys_ctx})
 
-    def event_stream():
-        for chunk in client.stream_chat(req.message, history):
-            data = json.dumps({"content": chunk}, ensure_ascii=False)
-            yield f"data: {data}\n\n"
-        yield "data: [DONE]\n\n"
+    chunks: List[str] = []
+
+    async def deltas():
+        async for chunk in client.astream_chat(req.message, history):
+            chunks.append(chunk)
+            yield chunk
+
+    async def event_stream():
+        try:
+            # 上游片段常常只有一两个字，按时间窗口 / 字节数合并后再发送
+            async for frame in coalesce(deltas()):
+                yield frame
+            # 只保存完整且未出错的回复，在 [DONE] 之前写入，保证下一轮能读到
+            if req.conversation_id and chunks and not chunks[-1].startswith("【请求错误】"):
+                await run_in_threadpool(CONVERSATIONS.append, req.conversation_id, req.message, "".join(chunks))
+            yield "data: [DONE]\n\n"
+        finally:
+            if slot is not None:
+                slot.release()
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 # ---------- 路由 ----------
 @router.post("/chat/stock")
-async def chat_stock(req: ChatRequest):
-    sys_ctx = _build_stock_context(req.stock_id or "", req.year)
+async def chat_stock(req: ChatRequest, request: Request):
+    # 同一股票的并发对话只构建一次上下文，构建在线程池中进行
+    invalid = _invalid_conversation(req)
+    if invalid is not None:
+        return invalid
+    stock_id = req.stock_id or ""
+    sys_ctx = await FLIGHTS.do(("stock_context", stock_id, req.year), _build_stock_context, stock_id, req.year)
+    history = await _load_history(req, "stock")
+    # 上游并发受限，个股对话优先于策略分析出队；排不上队时直接返回 429
+    try:
+        slot = await ADMISSION.acquire(_client_key(request), PRIORITY_STOCK)
+    except Overloaded as exc:
+        return _overloaded(exc)
     client = DeepSeekClient(stock_id=req.stock_id)
-    return _stream_response(client, req, sys_ctx)
+    return _stream_response(client, req, sys_ctx, slot, history)
 
 
 @router.post("/chat/strategy")
-async def chat_strategy(req: ChatRequest):
-    sys_ctx = _build_strategy_context(req.stock_id or "")
+async def chat_strategy(req: ChatRequest, request: Request):
+    invalid = _invalid_conversation(req)
+    if invalid is not None:
+        return invalid
+    user_id = req.stock_id or ""
+    sys_ctx = await FLIGHTS.do(("strategy_context", user_id), _build_strategy_context, user_id)
+    history = await _load_history(req, "strategy")
+    try:
+        slot = await ADMISSION.acquire(_client_key(request), PRIORITY_STRATEGY)
+    except Overloaded as exc:
+        return _overloaded(exc)
     client = DeepSeekClient(stock_id=req.stock_id)
-    return _stream_response(client, req, sys_ctx)
+    return _stream_response(client, req, sys_ctx, slot, history)
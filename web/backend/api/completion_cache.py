@@ -0,0 +1,112 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 通过环境变量开启：DEEPSEEK_CACHE=1，可选 DEEPSEEK_CACHE_PATH / DEEPSEEK_CACHE_MAX_MB
+DEFAULT_PATH = os.path.join("data", "cache", "completions.sqlite3")
+DEFAULT_MAX_MB = 64
+
+
+def completion_key(payload: Dict[str, Any]) -> str:
+    """模型、采样参数与完整消息列表（含系统提示）的哈希。"""
+    material = {k: payload.get(k) for k in ("model", "temperature", "max_tokens", "messages")}
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    精确匹配的 LLM 回复缓存，存放在本地 SQLite 文件中。
+    保存完整回复的流式片段列表，命中时按原片段直接回放；
+    总大小超过上限时按最近使用时间淘汰。
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, chunks TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS completions_lru ON completions (last_used)")
+        self._total = self._con.execute("SELECT coalesce(sum(size), 0) FROM completions").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._con.execute("SELECT chunks FROM completions WHERE key = ?", [key]).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._con.execute(
+                "UPDATE completions SET last_used = ?, hits = hits + 1 WHERE key = ?", [time.time(), key]
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, chunks: List[str]) -> None:
+        data = json.dumps(chunks, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._con.execute("SELECT size FROM completions WHERE key = ?", [key]).fetchone()
+            self._con.execute(
+                "INSERT OR REPLACE INTO completions (key, chunks, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                [key, data, size, now, now],
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """按 last_used 从旧到新删除，直到总大小回到上限的 90%。"""
+        target = self.max_bytes * 0.9
+        freed, keys = 0, []
+        for key, size in self._con.execute("SELECT key, size FROM completions ORDER BY last_used"):
+            if self._total - freed <= target:
+                break
+            keys.append(key)
+            freed += size
+        self._con.executemany("DELETE FROM completions WHERE key = ?", [(k,) for k in keys])
+        self._total -= freed
+        self.evictions += len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._con.execute("SELECT count(*) FROM completions").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+def cache_from_env() -> Optional[CompletionCache]:
+    """DEEPSEEK_CACHE 未开启时返回 None（默认关闭）。"""
+    if os.getenv("DEEPSEEK_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+        return None
+    path = os.getenv("DEEPSEEK_CACHE_PATH", DEFAULT_PATH)
+    max_mb = float(os.getenv("DEEPSEEK_CACHE_MAX_MB", str(DEFAULT_MAX_MB)))
+    return CompletionCache(path, int(max_mb * (1 << 20)))
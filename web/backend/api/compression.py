@@ -0,0 +1,149 @@
+from __future__ import annotations
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .conditional import matching_tag
+
+try:  # zstd 为可选依赖，未安装时只协商 gzip
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# 已压缩或需要即时推送（SSE）的类型不再压缩
+SKIP_TYPES = ("text/event-stream", "image/", "application/zip", "application/gzip")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding（含 q 值）选择 zstd 或 gzip，都不接受时返回 None。"""
+    prefs = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        prefs[name.strip().lower()] = q
+    star = prefs.get("*", 0.0)
+    candidates = (["zstd"] if zstandard is not None else []) + ["gzip"]
+    scored = [(prefs.get(enc, star), -i, enc) for i, enc in enumerate(candidates)]
+    q, _, enc = max(scored)
+    return enc if q > 0 else None
+
+
+def _suffix_etag(headers: MutableHeaders, encoding: str) -> None:
+    etag = headers.get("etag")
+    if etag and etag.endswith('"'):
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+
+def _echo_etag(headers: MutableHeaders, if_none_match: str) -> None:
+    """
+    304 没有响应体，无法判断原响应是否被压缩；回显客户端缓存的那个 ETag
+    （压缩响应带后缀、小于阈值未压缩的响应不带），保证与客户端缓存一致。
+    """
+    etag = headers.get("etag")
+    if not etag:
+        return
+    tag = matching_tag(if_none_match, etag)
+    if tag and tag != "*":
+        headers["ETag"] = tag
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int) -> None:
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self._sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip 头
+            self._sync = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, *, final: bool) -> bytes:
+        out = self._obj.compress(data)
+        # 流式响应每块都刷出，保证客户端能及时解码
+        return out + (self._obj.flush() if final else self._obj.flush(self._sync))
+
+
+class CompressionMiddleware:
+    """
+    gzip / zstd 响应压缩（纯 ASGI，支持流式响应）。
+    压缩后在 ETag 后追加 -gzip / -zstd，is_fresh 比较时会去掉该后缀；
+    304 响应回显客户端发来的 ETag。
+    """
+
+    def __init__(
+        self, app: ASGIApp, *, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "zstd": zstd_level}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = MutableHeaders(raw=start["headers"])
+
+            if compressor is None:
+                ctype = headers.get("content-type", "")
+                if start["status"] == 304:
+                    _echo_etag(headers, request_headers.get("if-none-match", ""))
+                if (
+                    start["status"] < 200 or start["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or ctype.startswith(SKIP_TYPES)
+                    or (not more and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.levels[encoding])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                _suffix_etag(headers, encoding)
+                data = compressor.compress(body, final=not more)
+                if more:
+                    del headers["content-length"]
+                else:
+                    headers["Content-Length"] = str(len(data))
+                await send(start)
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more),
+                "more_body": more,
+            })
+
+        await self.app(scope, receive, wrapped_send)
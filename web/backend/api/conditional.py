@@ -0,0 +1,54 @@
+from __future__ import annotations
+import hashlib
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# 数据接口统一的缓存策略：允许缓存，但每次使用前用 ETag 向服务端校验
+CACHE_CONTROL = "no-cache"
+# CompressionMiddleware 给压缩响应的 ETag 追加的后缀
+_ENCODING_SUFFIXES = ("-gzip\"", "-zstd\"")
+
+
+def make_etag(*parts: object) -> str:
+    """由数据集版本与请求参数生成强 ETag。"""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def request_etag(request: Request, version: str, *parts: object) -> str:
+    """数据集版本 + 路径 + 查询参数（+ 额外部分，如协商出的格式）生成 ETag。"""
+    return make_etag(version, request.url.path, request.url.query, *parts)
+
+
+def _strip_tag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def matching_tag(header: Optional[str], etag: str) -> Optional[str]:
+    """返回 If-None-Match 中命中 etag 的那一项（原样，可能带压缩后缀），未命中返回 None。"""
+    if not header:
+        return None
+    for tag in header.split(","):
+        if _strip_tag(tag) in ("*", etag):
+            return tag.strip()
+    return None
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """客户端 If-None-Match 是否命中当前 ETag（忽略压缩后缀）。"""
+    return matching_tag(request.headers.get("if-none-match"), etag) is not None
+
+
+def not_modified(etag: str, cache_control: Optional[str] = CACHE_CONTROL) -> Response:
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return Response(status_code=304, headers=headers)
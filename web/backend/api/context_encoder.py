@@ -0,0 +1,159 @@
+from __future__ import annotations
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 上下文默认 token 预算，可通过环境变量调整
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+MIN_ROWS = 5
+TRADING_DAYS = 252
+
+_CJK = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文及全角符号约 1 字 1 token，其余约 3.5 个字符 1 token。"""
+    cjk = len(_CJK.findall(text))
+    return cjk + int(np.ceil((len(text) - cjk) / 3.5))
+
+
+def _num(value: Any, digits: int = 2) -> str:
+    """数值保留 digits 位小数并去掉多余的 0，缺失值输出 -。"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "-" if value is None else str(value)
+    if not np.isfinite(value):
+        return "-"
+    return f"{value:.{digits}f}".rstrip("0").rstrip(".") or "0"
+
+
+def kline_stats(bars: pd.DataFrame) -> Dict[str, float]:
+    """
+    按时间升序的 K 线窗口统计：
+    trend 为对数收盘价线性回归斜率（%/日），vol 为年化波动率（%），
+    mdd 为窗口内最大回撤（%），support / resistance 为窗口最低价 / 最高价，chg 为区间涨跌幅（%）。
+    """
+    close = bars["close"].to_numpy(dtype=float)
+    n = len(close)
+    stats = {
+        "chg": (close[-1] / close[0] - 1) * 100 if n > 1 and close[0] else np.nan,
+        "support": float(np.nanmin(bars["low"].to_numpy(dtype=float))),
+        "resistance": float(np.nanmax(bars["high"].to_numpy(dtype=float))),
+    }
+    if n > 2:
+        logc = np.log(close)
+        x = np.arange(n, dtype=float)
+        stats["trend"] = float(np.polyfit(x, logc, 1)[0] * 100)
+        stats["vol"] = float(np.std(np.diff(logc), ddof=1) * np.sqrt(TRADING_DAYS) * 100)
+    else:
+        stats["trend"] = stats["vol"] = np.nan
+    peak = np.maximum.accumulate(close)
+    stats["mdd"] = float(np.max(1 - close / peak) * 100) if n else np.nan
+    return stats
+
+
+def _fit_rows(
+    header: str, lines: Sequence[str], budget: int, max_rows: Optional[int] = None
+) -> Tuple[List[str], int]:
+    """从最新一行往前取，直到用完预算（至少保留 MIN_ROWS 行）；返回保留的行与 token 数。"""
+    used = estimate_tokens(header)
+    kept: List[str] = []
+    if max_rows is not None:
+        lines = lines[-max_rows:] if max_rows > 0 else []
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget and len(kept) >= MIN_ROWS:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept, used
+
+
+class EncoderStats:
+    """各类上下文的次数与估算 token 数，用于 /api/metrics。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: Dict[str, List[int]] = {}
+
+    def record(self, kind: str, tokens: int) -> None:
+        with self._lock:
+            entry = self._data.setdefault(kind, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += tokens
+            entry[2] = tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            kind: {"contexts": n, "avg_tokens": round(total / n, 1), "last_tokens": last}
+            for kind, (n, total, last) in self._data.items()
+        }
+
+
+STATS = EncoderStats()
+
+
+def encode_stock_context(
+    stock_id: str, detail: Dict[str, Any], bars: pd.DataFrame, budget: int = TOKEN_BUDGET,
+    max_rows: Optional[int] = None,
+) -> Tuple[str, int]:
+    """
+    个股上下文：基础概况 + 窗口统计 + 紧凑 K 线表（date,o,h,l,c，最新在后）。
+    表格行数按预算自适应，返回 (文本, 估算 token 数)。
+    """
+    bars = bars.sort_values("date", kind="stable")
+    s = kline_stats(bars)
+    head = [
+        f"【{stock_id} {detail.get('证券名称', detail.get('name', ''))}】"
+        f"{detail.get('年份', '')}年 涨跌{_num(detail.get('年涨跌幅'))}% 回撤{_num(detail.get('最大回撤'))}% "
+        f"PE{_num(detail.get('市盈率'))} PB{_num(detail.get('市净率'))} "
+        f"夏普{_num(detail.get('夏普比率-普通收益率-日-一年定存利率'))}",
+        f"【近{len(bars)}日】涨跌{_num(s['chg'])}% 趋势{_num(s['trend'], 3)}%/日 "
+        f"年化波动{_num(s['vol'])}% 最大回撤{_num(s['mdd'])}% "
+        f"支撑{_num(s['support'])} 阻力{_num(s['resistance'])}",
+        "【K线 date(yymmdd),o,h,l,c】",
+    ]
+    header = "\n".join(head)
+    dates = pd.to_datetime(bars["date"]).dt.strftime("%y%m%d").tolist()
+    columns = [bars[c].tolist() for c in ("open", "high", "low", "close")]
+    lines = [",".join([d] + [_num(col[i]) for col in columns]) for i, d in enumerate(dates)]
+    rows, tokens = _fit_rows(header, lines, budget, max_rows)
+    text = header + "\n" + "\n".join(rows)
+    STATS.record("stock", tokens)
+    return text, tokens
+
+
+def encode_strategy_context(
+    user_id: str, summary: Dict[str, Any], profile: Dict[str, Any], orders: pd.DataFrame,
+    budget: int = TOKEN_BUDGET, max_rows: Optional[int] = None, top_codes: int = 5,
+) -> Tuple[str, int]:
+    """
+    用户策略上下文：汇总指标 + 方向 / 盈亏分布 + 高频标的 + 紧凑成交表（最新在后）。
+    profile 为全部订单的聚合统计（orders / buy / sell / win / lose 笔数与 codes: {代码: 笔数}），
+    由调用方在数据库中聚合；orders 只需最近若干笔（任意顺序），表格行数按预算自适应。
+    """
+    orders = orders.sort_values("time", kind="stable")
+    codes = sorted(profile.get("codes", {}).items(), key=lambda item: (-item[1], item[0]))
+    top = " ".join(f"{c}×{n}" for c, n in codes[:top_codes])
+    head = [
+        f"【用户 {user_id}】交易{summary.get('trades', profile.get('orders', 0))}笔 "
+        f"收益率{_num(summary.get('returnRate'))}% 胜率{_num(summary.get('winRate'))}%",
+        f"买{profile.get('buy', 0)} 卖{profile.get('sell', 0)} 盈{profile.get('win', 0)} 亏{profile.get('lose', 0)} "
+        f"标的{len(codes)}只 常用:{top}",
+        "【成交 time,code,dir(b买s卖),price,result(w盈l亏)】",
+    ]
+    header = "\n".join(head)
+    lines = [
+        f"{t},{c},{d[:1] if isinstance(d, str) else d},{_num(p)},{r[:1] if isinstance(r, str) else r}"
+        for t, c, d, p, r in orders[["time", "code", "direction", "price", "result"]].itertuples(index=False)
+    ]
+    rows, tokens = _fit_rows(header, lines, budget, max_rows)
+    text = header + "\n" + "\n".join(rows)
+    STATS.record("strategy", tokens)
+    return text, tokens
@@ -0,0 +1,242 @@
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .context_encoder import estimate_tokens
+
+# 可通过环境变量调整：CHAT_STORE_PATH / CHAT_HISTORY_BUDGET / CHAT_KEEP_TURNS / CHAT_STORE_TTL_DAYS
+DEFAULT_PATH = os.path.join("data", "chat", "conversations.sqlite3")
+HISTORY_BUDGET = int(os.getenv("CHAT_HISTORY_BUDGET", "1500"))  # 摘要 + 原文轮次的 token 上限
+KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "4"))  # 至少保留的最近原文消息数
+TTL_DAYS = float(os.getenv("CHAT_STORE_TTL_DAYS", "7"))
+
+CONVERSATION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+_SENTENCE_END = re.compile(r"[。！？!?；;\n]")
+_MARKDOWN = re.compile(r"[#*`>|_~]+|^\s*[-+]\s+", re.M)
+_ROLE_NAMES = {"user": "问", "assistant": "答"}
+_BRIEF_LIMITS = {"user": 50, "assistant": 100}  # 折叠进摘要时每条消息保留的字数
+
+
+def _brief(text: str, limit: int) -> str:
+    """去掉 markdown 标记、合并空白，截取不超过 limit 字，尽量在句末截断。"""
+    text = re.sub(r"\s+", " ", _MARKDOWN.sub("", text)).strip()
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END.finditer(head)]
+    return head[: ends[-1]] if ends and ends[-1] > limit // 2 else head + "…"
+
+
+class ConversationStore:
+    """
+    服务端会话存储（本地 SQLite）：按会话 ID 保存对话轮次，客户端每次只需发送新消息。
+    摘要与原文轮次的估算 token 数超过预算时，把最早的问答折叠进滚动摘要
+    （每轮问答压成一行，各取开头一两句；摘要本身限制在预算的一半以内，超出时丢弃最早的行），
+    因此提示长度有上限，且不需要额外调用上游模型。
+    数据库在首次使用时才打开（导入模块、创建实例都不会写磁盘）。
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        budget: int = HISTORY_BUDGET,
+        keep_turns: int = KEEP_TURNS,
+        ttl_days: float = TTL_DAYS,
+    ) -> None:
+        self.path = path
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        self.loads = 0
+        self.appends = 0
+        self.compactions = 0
+        self.folded_turns = 0
+        self.resets = 0
+        self._prompt_tokens = 0
+
+    def _db(self) -> sqlite3.Connection:
+        """首次调用时创建目录、打开数据库并建表；调用方须持有 self._lock。"""
+        if self._con is not None:
+            return self._con
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        con = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, context_id TEXT NOT NULL,"
+            " summary TEXT NOT NULL DEFAULT '', summary_tokens INTEGER NOT NULL DEFAULT 0,"
+            " folded INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,"
+            " content TEXT NOT NULL, tokens INTEGER NOT NULL, PRIMARY KEY (conversation_id, seq))"
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated)")
+        self._con = con
+        self._prune()
+        return con
+
+    def close(self) -> None:
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+
+    # ---------- 读取 ---------- #
+    def history(self, conversation_id: str, kind: str, context_id: str) -> List[Dict[str, str]]:
+        """
+        返回发给模型的历史消息：滚动摘要（如有）+ 未折叠的原文轮次。
+        同一会话 ID 换了对话类型或标的时视为新会话，旧内容清空。
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT kind, context_id, summary, summary_tokens FROM conversations WHERE id = ?",
+                [conversation_id],
+            ).fetchone()
+            if row is not None and (row[0], row[1]) != (kind, context_id):
+                self._delete(conversation_id)
+                self.resets += 1
+                row = None
+            if row is None:
+                now = time.time()
+                self._con.execute(
+                    "INSERT INTO conversations (id, kind, context_id, created, updated) VALUES (?, ?, ?, ?, ?)",
+                    [conversation_id, kind, context_id, now, now],
+                )
+                self.loads += 1
+                return []
+            turns = self._con.execute(
+                "SELECT role, content, tokens FROM turns WHERE conversation_id = ? ORDER BY seq",
+                [conversation_id],
+            ).fetchall()
+            self.loads += 1
+            self._prompt_tokens += row[3] + sum(t[2] for t in turns)
+        messages = []
+        if row[2]:
+            messages.append({"role": "system", "content": "【此前对话摘要】\n" + row[2]})
+        messages.extend({"role": role, "content": content} for role, content, _ in turns)
+        return messages
+
+    # ---------- 写入 ---------- #
+    def append(self, conversation_id: str, message: str, reply: str) -> None:
+        """保存一问一答，超出预算时折叠最早的轮次。"""
+        now = time.time()
+        with self._lock:
+            seq = self._db().execute(
+                "SELECT coalesce(max(seq), -1) FROM turns WHERE conversation_id = ?", [conversation_id]
+            ).fetchone()[0]
+            self._con.execute("BEGIN")
+            try:
+                self._con.executemany(
+                    "INSERT INTO turns (conversation_id, seq, role, content, tokens) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (conversation_id, seq + 1, "user", message, estimate_tokens(message)),
+                        (conversation_id, seq + 2, "assistant", reply, estimate_tokens(reply)),
+                    ],
+                )
+                self._con.execute("UPDATE conversations SET updated = ? WHERE id = ?", [now, conversation_id])
+                self._compact(conversation_id)
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+            self.appends += 1
+            if self.appends % 100 == 0:
+                self._prune()
+
+    def _compact(self, conversation_id: str) -> None:
+        row = self._con.execute(
+            "SELECT summary, summary_tokens, folded FROM conversations WHERE id = ?", [conversation_id]
+        ).fetchone()
+        if row is None:
+            return
+        summary, summary_tokens, folded = row
+        turns = self._con.execute(
+            "SELECT seq, role, content, tokens FROM turns WHERE conversation_id = ? ORDER BY seq",
+            [conversation_id],
+        ).fetchall()
+        total = summary_tokens + sum(t[3] for t in turns)
+        if total <= self.budget:
+            return
+
+        # 按整轮问答从最早开始折叠，直到回到预算内（至少保留 keep_turns 条原文）
+        cut = 0
+        lines = summary.split("\n") if summary else []
+        while cut < len(turns) - self.keep_turns and total > self.budget:
+            end = cut + 1
+            if turns[cut][1] == "user" and end < len(turns) and turns[end][1] == "assistant":
+                end += 1
+            parts = [
+                f"{_ROLE_NAMES.get(role, role)}: {_brief(content, _BRIEF_LIMITS.get(role, 100))}"
+                for _, role, content, _ in turns[cut:end]
+            ]
+            lines.append(" ".join(parts))
+            total -= sum(t[3] for t in turns[cut:end])
+            cut = end
+        if cut == 0:
+            return
+        # 摘要本身限制在预算的一半，超出时丢弃最早的行
+        summary_budget = self.budget // 2
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > summary_budget:
+            lines.pop(0)
+        summary = "\n".join(lines)
+        self._con.execute(
+            "UPDATE conversations SET summary = ?, summary_tokens = ?, folded = ? WHERE id = ?",
+            [summary, estimate_tokens(summary), folded + cut, conversation_id],
+        )
+        self._con.execute(
+            "DELETE FROM turns WHERE conversation_id = ? AND seq <= ?", [conversation_id, turns[cut - 1][0]]
+        )
+        self.compactions += 1
+        self.folded_turns += cut
+
+    # ---------- 清理 ---------- #
+    def prune(self) -> None:
+        with self._lock:
+            self._db()
+            self._prune()
+
+    def _prune(self) -> None:
+        """删除超过 TTL 未更新的会话。"""
+        cutoff = time.time() - self.ttl
+        stale = [r[0] for r in self._con.execute("SELECT id FROM conversations WHERE updated < ?", [cutoff])]
+        for conversation_id in stale:
+            self._delete(conversation_id)
+
+    def _delete(self, conversation_id: str) -> None:
+        self._con.execute("DELETE FROM turns WHERE conversation_id = ?", [conversation_id])
+        self._con.execute("DELETE FROM conversations WHERE id = ?", [conversation_id])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            # 统计不触发打开数据库，尚未使用时计数为 None
+            conversations = turns = None
+            if self._con is not None:
+                conversations, turns = self._con.execute(
+                    "SELECT (SELECT count(*) FROM conversations), (SELECT count(*) FROM turns)"
+                ).fetchone()
+        return {
+            "path": self.path,
+            "conversations": conversations,
+            "turns": turns,
+            "budget_tokens": self.budget,
+            "loads": self.loads,
+            "appends": self.appends,
+            "compactions": self.compactions,
+            "folded_turns": self.folded_turns,
+            "resets": self.resets,
+            "avg_history_tokens": round(self._prompt_tokens / self.loads, 1) if self.loads else None,
+        }
+
+
+def store_from_env() -> ConversationStore:
+    return ConversationStore(os.getenv("CHAT_STORE_PATH", DEFAULT_PATH))
@@ -0,0 +1,63 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class DatasetCache:
+    """
+    parquet 文件的内存列式快照。
+    每次访问只做一次 os.stat 比较 mtime/大小，文件变化时整体重新加载并原子替换，
+    读请求始终拿到完整的旧表或新表。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Tuple[Optional[tuple], Optional[pa.Table]] = (None, None)
+        self.hits = 0
+        self.misses = 0  # 即重新加载次数
+
+    @staticmethod
+    def _stamp(path: str) -> tuple:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self) -> pa.Table:
+        """返回当前快照；文件不存在时抛出 FileNotFoundError。"""
+        stamp = self._stamp(self.path)
+        state = self._state
+        if state[0] == stamp:
+            self.hits += 1
+            return state[1]
+
+        with self._lock:
+            state = self._state
+            if state[0] != stamp:
+                self.misses += 1
+                table = pq.read_table(self.path)
+                state = self._state = (stamp, table)
+            else:
+                self.hits += 1
+        return state[1]
+
+    @property
+    def version(self) -> str:
+        stamp = self._state[0]
+        return "unloaded" if stamp is None else f"{stamp[0]:x}-{stamp[1]:x}"
+
+    def stats(self) -> Dict[str, Any]:
+        table = self._state[1]
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "version": self.version,
+            "rows": 0 if table is None else table.num_rows,
+            "memory_bytes": 0 if table is None else table.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping, Optional, Sequence
+
+import duckdb
+import pyarrow as pa
+from starlette.concurrency import run_in_threadpool
+
+
+class DuckDBPool:
+    """
+    进程级 DuckDB 连接池：所有请求共享同一个数据库实例，
+    每个请求从池中借出一个 cursor（独立的连接句柄，可跨线程并发使用）。
+    """
+
+    def __init__(self, database: str = ":memory:", *, size: int = 16) -> None:
+        self.size = size
+        self._con = duckdb.connect(database=database)
+        self._idle: "queue.LifoQueue[duckdb.DuckDBPyConnection]" = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._configure()
+
+    def _configure(self) -> None:
+        # 缓存 parquet footer，避免每次查询都重新解析元数据
+        for setting in ("parquet_metadata_cache", "enable_object_cache"):
+            try:
+                self._con.execute(f"SET {setting} = true")
+                break
+            except duckdb.Error:
+                continue
+
+    # ---------- 借还 cursor ---------- #
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        try:
+            cur = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                cur = self._con.cursor()
+        try:
+            yield cur
+        finally:
+            try:
+                self._idle.put_nowait(cur)
+            except queue.Full:
+                cur.close()
+
+    # ---------- 查询 ---------- #
+    @contextmanager
+    def _bound(self, tables: Optional[Mapping[str, Any]]) -> Iterator[duckdb.DuckDBPyConnection]:
+        """借出 cursor，并把内存表（Arrow/DataFrame）临时注册为同名视图。"""
+        with self.cursor() as cur:
+            names = list(tables or {})
+            for name in names:
+                cur.register(name, tables[name])
+            try:
+                yield cur
+            finally:
+                for name in names:
+                    cur.unregister(name)
+
+    def fetchdf(
+        self, sql: str, params: Optional[Sequence[Any]] = None, *, tables: Optional[Mapping[str, Any]] = None
+    ):
+        """参数化（预编译）查询，返回 DataFrame。"""
+        with self._bound(tables) as cur:
+            return cur.execute(sql, params or []).fetchdf()
+
+    def fetchall(
+        self, sql: str, params: Optional[Sequence[Any]] = None, *, tables: Optional[Mapping[str, Any]] = None
+    ) -> list:
+        with self._bound(tables) as cur:
+            return cur.execute(sql, params or []).fetchall()
+
+    def iter_batches(
+        self,
+        sql: str,
+        params: Optional[Sequence[Any]] = None,
+        *,
+        batch_rows: int = 8192,
+        tables: Optional[Mapping[str, Any]] = None,
+    ) -> Iterator[pa.RecordBatch]:
+        """流式读取查询结果，逐个产出 Arrow record batch；迭代期间占用一个 cursor。"""
+        with self._bound(tables) as cur:
+            cur.execute(sql, params or [])
+            if hasattr(cur, "to_arrow_reader"):
+                reader = cur.to_arrow_reader(batch_rows)
+            else:  # duckdb < 1.4
+                reader = cur.fetch_record_batch(batch_rows)
+            yield from reader
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """在线程池中执行阻塞查询，避免卡住事件循环。"""
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def file_version(path: str) -> str:
+    """数据集版本号：文件 mtime + 大小，文件被替换后自动变化。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+# 全局共享连接池
+POOL = DuckDBPool()
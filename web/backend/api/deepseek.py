@@ -1,12 +1,65 @@
 from __future__ import annotations
 import json
 import os
+import threading
+import httpx
 import requests
 from dotenv import load_dotenv
-from typing import Dict, List, Optional, Iterable
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Dict, List, Optional, Iterable
+
+from .completion_cache import CompletionCache, cache_from_env, completion_key
 
 load_dotenv()
 
+DEFAULT_BASE_URL = "https://api.deepseek.com/v1"
+
+# 回复缓存（默认关闭，见 completion_cache.cache_from_env）
+COMPLETIONS = cache_from_env()
+
+# ---------- 共享 HTTP 连接池 ---------- #
+# 连接池与超时可通过环境变量调整；同一进程内的所有对话复用连接（keep-alive / HTTP/2 多路复用）
+POOL_SIZE = int(os.getenv("DEEPSEEK_POOL_SIZE", "200"))
+KEEPALIVE_SIZE = int(os.getenv("DEEPSEEK_KEEPALIVE_SIZE", "100"))
+CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("DEEPSEEK_READ_TIMEOUT", "60"))  # 两个流式片段之间的最长间隔
+
+_SESSION = requests.Session()
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+_ASYNC_LOCK = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  httpx[http2] 的可选依赖
+    except ImportError:
+        return False
+    return True
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """进程级共享的异步客户端（首次使用时创建）。"""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+        with _ASYNC_LOCK:
+            if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+                _ASYNC_CLIENT = httpx.AsyncClient(
+                    http2=_http2_available(),
+                    limits=httpx.Limits(
+                        max_connections=POOL_SIZE, max_keepalive_connections=KEEPALIVE_SIZE
+                    ),
+                    timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                )
+    return _ASYNC_CLIENT
+
+
+async def close_async_client() -> None:
+    """应用关闭时释放连接池。"""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        await _ASYNC_CLIENT.aclose()
+        _ASYNC_CLIENT = None
+
 class DeepSeekClient:
     """
     轻量封装 DeepSeek Chat 接口，屏蔽流/非流细节。
@@ -21,14 +74,17 @@ class DeepSeekClient:
         max_tokens: int = 2000,
         temperature: float = 0.6,
         role_description: str | None = None,
-        base_url: str = "https://api.deepseek.com/v1",
+        base_url: Optional[str] = None,
+        cache: Optional[CompletionCache] = None,
     ) -> None:
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         self.stock_id = stock_id
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
-        self.base_url = base_url.rstrip("/")
+        # DEEPSEEK_BASE_URL 可指向本地 mock 服务（bench/mock_llm.py）做离线压测
+        self.base_url = (base_url or os.getenv("DEEPSEEK_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.cache = cache or COMPLETIONS
 
         self.role_description = role_description or (
             "你是一名专业的量化研究员，擅长金融市场分析、技术分析与交易策略评估。"
@@ -46,16 +102,22 @@ class DeepSeekClient:
     ) -> str:
         """
         同步调用，直接返回完整回复（或流式由 caller 处理）。
+        非流式调用在开启缓存时先查缓存。
         """
         payload = self._build_payload(message, history, stream=stream)
+        key = self._cache_key(payload) if not stream else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return "".join(cached)
 
         try:
-            resp = requests.post(
+            resp = _SESSION.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json=payload,
                 stream=stream,
-                timeout=60,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
             )
             resp.raise_for_status()
         except requests.RequestException as exc:  # pragma: no cover
@@ -65,8 +127,10 @@ class DeepSeekClient:
             # 调用方自己解析，非此函数职责
             return resp
 
-        content = resp.json()["choices"][0]["message"]["content"]
-        return self._post_process(content)
+        content = self._post_process(resp.json()["choices"][0]["message"]["content"])
+        if key:
+            self.cache.put(key, [content])
+        return content
 
     def stream_chat(
         self, message: str, history: Optional[List[Dict]] = None
@@ -74,28 +138,108 @@ class DeepSeekClient:
         """
         生成器：按 DeepSeek 的 SSE 片段流式 yield。
         调用方负责终端 '\n\n' 拼接。
+        缓存命中时直接回放缓存的片段；只有完整收到 [DONE] 的回复才写入缓存。
         """
+        key = self._cache_key(self._build_payload(message, history, stream=False))
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            yield from cached
+            return
+
         resp = self.chat(message, history, stream=True)
         if isinstance(resp, str):  # 已处理过错误，直接返回
             yield resp
             return
 
-        for raw in resp.iter_lines(decode_unicode=True):
-            if not raw.startswith("data: "):
-                continue
-            raw = raw.replace("data: ", "")
-            if raw.strip() == "[DONE]":
-                break
-            try:
-                data = json.loads(raw)
-                delta = data["choices"][0].get("delta", {})
-                if "content" in delta:
-                    yield self._post_process(delta["content"])
-            except json.JSONDecodeError:
-                # 忽略解析失败的 keep-alive 行
-                continue
+        chunks: List[str] = []
+        with resp:
+            for raw in resp.iter_lines(decode_unicode=True):
+                done, content = self._parse_line(raw)
+                if done:
+                    if key:
+                        self.cache.put(key, chunks)
+                    break
+                if content is not None:
+                    chunks.append(content)
+                    yield content
+
+    # ---------- 异步接口 ---------- #
+    async def achat(self, message: str, history: Optional[List[Dict]] = None) -> str:
+        """异步非流式调用，走共享连接池。"""
+        payload = self._build_payload(message, history, stream=False)
+        key = self._cache_key(payload)
+        if key:
+            cached = await run_in_threadpool(self.cache.get, key)
+            if cached is not None:
+                return "".join(cached)
+        try:
+            resp = await get_async_client().post(
+                f"{self.base_url}/chat/completions", headers=self.headers, json=payload
+            )
+            resp.raise_for_status()
+        except httpx.HTTPError as exc:  # pragma: no cover
+            return f"【请求错误】{exc}"
+        content = self._post_process(resp.json()["choices"][0]["message"]["content"])
+        if key:
+            await run_in_threadpool(self.cache.put, key, [content])
+        return content
+
+    async def astream_chat(
+        self, message: str, history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[str]:
+        """
+        异步生成器：流式 yield 回复片段，不占用线程池线程。
+        调用方断开时生成器被关闭，连接随之归还连接池。
+        缓存命中时不请求上游，直接全速回放缓存的片段。
+        """
+        payload = self._build_payload(message, history, stream=True)
+        key = self._cache_key(payload)
+        cached = await run_in_threadpool(self.cache.get, key) if key else None
+        if cached is not None:
+            for content in cached:
+                yield content
+            return
+
+        chunks: List[str] = []
+        try:
+            async with get_async_client().stream(
+                "POST", f"{self.base_url}/chat/completions", headers=self.headers, json=payload
+            ) as resp:
+                resp.raise_for_status()
+                async for raw in resp.aiter_lines():
+                    done, content = self._parse_line(raw)
+                    if done:
+                        if key:
+                            await run_in_threadpool(self.cache.put, key, chunks)
+                        break
+                    if content is not None:
+                        chunks.append(content)
+                        yield content
+        except httpx.HTTPError as exc:  # pragma: no cover
+            yield f"【请求错误】{exc}"
 
     # ---------- 私有辅助 ---------- #
+    def _cache_key(self, payload: Dict) -> Optional[str]:
+        """未开启缓存时返回 None；stream 标志不参与键计算。"""
+        return completion_key(payload) if self.cache is not None else None
+
+    def _parse_line(self, raw: str):
+        """解析一行 SSE，返回 (是否结束, 内容片段或 None)。"""
+        if not raw.startswith("data: "):
+            return False, None
+        raw = raw.replace("data: ", "")
+        if raw.strip() == "[DONE]":
+            return True, None
+        try:
+            data = json.loads(raw)
+            delta = data["choices"][0].get("delta", {})
+            if "content" in delta:
+                return False, self._post_process(delta["content"])
+        except json.JSONDecodeError:
+            # 忽略解析失败的 keep-alive 行
+            pass
+        return False, None
+
     def _build_payload(
         self, message: str, history: Optional[List[Dict]], *, stream: bool
     ) -> Dict:
@@ -0,0 +1,33 @@
+from __future__ import annotations
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def downsample_ohlc(df: pd.DataFrame, max_points: Optional[int]) -> pd.DataFrame:
+    """
+    OHLC 保真降采样：把按时间排序的 K 线等分为 max_points 个桶，
+    每桶取首根开盘、末根收盘、最高价最大值、最低价最小值、成交量求和，
+    日期取桶内最后一个交易日，因此极值不会被丢弃。
+    """
+    n = len(df)
+    if not max_points or n <= max_points:
+        return df
+
+    # n > max_points 时每个桶至少 1 根，起点严格递增
+    starts = np.linspace(0, n, max_points + 1).astype(np.int64)[:-1]
+    ends = np.append(starts[1:], n) - 1
+
+    out = {"date": df["date"].to_numpy()[ends]}
+    if "open" in df:
+        out["open"] = df["open"].to_numpy()[starts]
+    if "close" in df:
+        out["close"] = df["close"].to_numpy()[ends]
+    if "high" in df:
+        out["high"] = np.maximum.reduceat(df["high"].to_numpy(), starts)
+    if "low" in df:
+        out["low"] = np.minimum.reduceat(df["low"].to_numpy(), starts)
+    if "volume" in df:
+        out["volume"] = np.add.reduceat(df["volume"].to_numpy(), starts)
+    return pd.DataFrame(out, columns=[c for c in df.columns if c in out])
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import json
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# 响应格式：records（默认，对象数组）/ columnar（列式 JSON）/ arrow（Arrow IPC 流）
+# 以及仅流式接口支持的 ndjson（每行一条 JSON 记录）
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON = "application/vnd.riskparix.columnar+json"
+NDJSON = "application/x-ndjson"
+FORMATS = ("records", "columnar", "arrow")
+
+
+def negotiate(request: Request, fmt: Optional[str] = None, allowed: Sequence[str] = FORMATS) -> str:
+    """format= 参数优先，其次看 Accept 头，默认 records。"""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in allowed:
+            raise ValueError(f"不支持的格式: {fmt}，可选 {'/'.join(allowed)}")
+        return fmt
+    accept = request.headers.get("accept", "")
+    for name, media_type in (("arrow", ARROW_STREAM), ("columnar", COLUMNAR_JSON), ("ndjson", NDJSON)):
+        if name in allowed and media_type in accept:
+            return name
+    return "records"
+
+
+def _json_cell(value: Any) -> Any:
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (str, int, bool)):
+        return value
+    return jsonable_encoder(value)
+
+
+def _json_values(s: pd.Series) -> List[Any]:
+    """
+    单列转为可直接 JSON 序列化的值列表：
+    时间列转 ISO 字符串，NaN / NaT / ±inf 转为 null，其余对象交给 jsonable_encoder。
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        mask = s.isna().to_numpy()
+        if getattr(s.dt, "tz", None) is None:
+            raw = s.to_numpy().astype("datetime64[ns]")
+            ns = raw.view("int64")[~mask]
+            unit = "s" if not (ns % 1_000_000_000).any() else "us" if not (ns % 1000).any() else "ns"
+            values = np.datetime_as_string(raw, unit=unit).astype(object)
+        else:
+            values = np.array([v.isoformat() if not m else None for v, m in zip(s, mask)], dtype=object)
+        values[mask] = None
+        return values.tolist()
+    if pd.api.types.is_float_dtype(s):
+        arr = s.to_numpy(dtype=float, na_value=np.nan)
+        values = arr.astype(object)
+        values[~np.isfinite(arr)] = None
+        return values.tolist()
+    if pd.api.types.is_object_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        return [_json_cell(v) for v in s.tolist()]
+    return s.astype(object).where(s.notna(), None).tolist()
+
+
+def to_columns(df) -> Dict[str, list]:
+    """DataFrame -> {列名: 值数组}，逐列转换为 JSON 安全的值。"""
+    return {str(col): _json_values(df[col]) for col in df.columns}
+
+
+def to_records(df) -> List[Dict[str, Any]]:
+    """DataFrame -> 对象数组，取值规则与 to_columns 相同。"""
+    columns = to_columns(df)
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def to_arrow_ipc(df) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(df, fmt: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """按协商好的格式序列化 DataFrame。"""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept"
+    if fmt == "arrow":
+        return Response(to_arrow_ipc(df), media_type=ARROW_STREAM, headers=headers)
+    if fmt == "columnar":
+        return JSONResponse(to_columns(df), headers=headers, media_type=COLUMNAR_JSON)
+    return JSONResponse(to_records(df), headers=headers)
+
+
+def _ndjson_lines(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    # 取值规则与 records / columnar 一致：时间为 ISO 字符串，NaN / ±inf 为 null
+    for batch in batches:
+        if batch.num_rows:
+            yield "".join(
+                json.dumps(row, ensure_ascii=False, allow_nan=False) + "\n" for row in to_records(batch.to_pandas())
+            ).encode("utf-8")
+
+
+def stream_ndjson(batches: Iterable[pa.RecordBatch], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """逐个 Arrow record batch 序列化为 NDJSON 推送；查询本身是否需要先物化（如 ORDER BY）由调用方决定。"""
+    return StreamingResponse(_ndjson_lines(batches), media_type=NDJSON, headers=headers)
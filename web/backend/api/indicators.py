@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from functools import lru_cache
+from typing import Optional
+
+from .conditional import CACHE_CONTROL, is_fresh, make_etag, not_modified
+from .db import file_version
+from .formats import encode, negotiate
+from .kline import KLINE_PATH, PERIODS, _load_bars, _slice_bars, normalize_code
+from .singleflight import FLIGHTS
+from .technicals import Spec, compute_indicators, parse_indicators
+
+router = APIRouter()
+
+DEFAULT_INDICATORS = "ma5,ma10,ma20"
+
+@lru_cache(maxsize=512)
+def _load_indicators(norm_code: str, period: str, specs: Spec, version: str):
+    """按 (code, 周期, 指标集合, 数据版本) 缓存；返回值被多个请求共享，调用方不得修改。"""
+    bars = _load_bars(norm_code, period, version)
+    return compute_indicators(bars, specs)
+
+def _render(result, fmt: str, start, end, limit, headers):
+    """截取并序列化；在线程池中执行，不阻塞事件循环。"""
+    return encode(_slice_bars(result, start, end, None, limit), fmt, headers=headers)
+
+@router.get("/indicators/{code}")
+async def get_indicators(
+    request: Request,
+    code: str,
+    names: str = DEFAULT_INDICATORS,
+    period: str = "D",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    """
+    获取技术指标，names 为逗号分隔的指标列表：
+    ma{N} / ema{N}（expma{N}）/ macd / rsi{N} / boll{N} / atr{N}，省略 N 时使用默认周期。
+    所有指标在同一份 K 线上一次计算，按数据版本缓存；start/end/limit 同 /kline。
+    """
+    try:
+        norm_code = normalize_code(code)
+        period = period.upper()
+        if period not in PERIODS:
+            return JSONResponse({"error": f"不支持的周期: {period}，可选 {'/'.join(PERIODS)}"}, status_code=400)
+        if limit is not None and limit <= 0:
+            return JSONResponse({"error": "limit 必须为正整数"}, status_code=400)
+        try:
+            specs = parse_indicators(names)
+            fmt = negotiate(request, fmt)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if not specs:
+            return JSONResponse({"error": "names 不能为空"}, status_code=400)
+
+        version = file_version(KLINE_PATH)
+        etag = make_etag(version, "indicators", norm_code, period, specs, start, end, limit, fmt)
+        if is_fresh(request, etag):
+            return not_modified(etag)
+
+        result = await FLIGHTS.do(
+            ("indicators", norm_code, period, specs, version), _load_indicators, norm_code, period, specs, version
+        )
+
+        if result.empty:
+            return JSONResponse({"error": f"未找到股票代码: {norm_code}"}, status_code=404)
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        return await run_in_threadpool(_render, result, fmt, start, end, limit, headers)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
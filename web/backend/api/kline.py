@@ -1,11 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import JSONResponse
-import duckdb
-import os
+from functools import lru_cache
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import pandas as pd
+
+from .catalog import CATALOG
+from .conditional import CACHE_CONTROL, is_fresh, make_etag, not_modified
+from .db import POOL, file_version
+from .downsample import downsample_ohlc
+from .formats import encode, negotiate, to_columns
+from .kline_store import KlineStore
+from .singleflight import FLIGHTS
 
 router = APIRouter()
 
-KLINE_PATH = os.path.join("data", "day_klines", "all_klines.parquet")
+KLINE_PATH = CATALOG.path("all_klines")
+KLINES = KlineStore(KLINE_PATH)
 
 def normalize_code(code: str) -> str:
     code = code.upper().replace("-", "").replace(".", "")
@@ -24,39 +36,181 @@ def normalize_code(code: str) -> str:
     else:
         return f"{'sh' if code.startswith('6') else 'sz'}.{code}"
 
+# K 线周期 -> date_trunc 粒度，None 表示日线原样返回
+PERIODS = {"D": None, "W": "week", "M": "month", "Q": "quarter", "Y": "year"}
+
+def _bars_sql(source: str, period: str) -> str:
+    """日线直接输出；其他周期在 DuckDB 中按 first/max/min/last/sum 聚合，日期取周期内最后一个交易日。"""
+    unit = PERIODS[period]
+    if unit is None:
+        return (
+            "SELECT code, CAST(date AS VARCHAR) AS date, open, close, high, low, volume "
+            f"FROM {source} ORDER BY code, date"
+        )
+    return f"""
+    SELECT code, CAST(max(d) AS VARCHAR) AS date,
+           arg_min(open, d) AS open, arg_max(close, d) AS close,
+           max(high) AS high, min(low) AS low, sum(volume) AS volume
+    FROM (SELECT CAST(date AS DATE) AS d, * FROM {source})
+    GROUP BY code, date_trunc('{unit}', d)
+    ORDER BY code, date
+    """
+
+def _query_bars(norm_codes: List[str], period: str):
+    """一次扫描读取并聚合多只股票的 K 线，结果按 (code, date) 排序。"""
+    # 有聚簇索引时只读这些股票的 row group，否则退回全文件扫描
+    bars = KLINES.lookup(norm_codes)
+    if bars is None:
+        source = f"(SELECT * FROM {CATALOG.view('all_klines')} WHERE code IN (SELECT unnest(?)))"
+        df = POOL.fetchdf(_bars_sql(source, period), [norm_codes])
+    else:
+        with POOL.cursor() as cur:
+            df = cur.from_arrow(bars).query("bars", _bars_sql("bars", period)).fetchdf()
+    price_cols = ["open", "close", "high", "low", "volume"]
+    df[price_cols] = df[price_cols].astype(float)
+    return df
+
+@lru_cache(maxsize=512)
+def _load_bars(norm_code: str, period: str, version: str):
+    """
+    单只股票的 K 线，按 (code, 周期, 数据版本) 缓存。
+    返回的 DataFrame 被多个请求共享，调用方不得修改。
+    """
+    return _query_bars([norm_code], period).drop(columns="code")
+
+def _slice_bars(df, start: Optional[str], end: Optional[str], since: Optional[str], limit: Optional[int]):
+    """按日期区间截取（start/end 含端点，since 不含），limit 保留最近的 N 根。"""
+    mask = None
+    for cond in (
+        df["date"] >= start if start else None,
+        df["date"] <= end if end else None,
+        df["date"] > since if since else None,
+    ):
+        if cond is not None:
+            mask = cond if mask is None else mask & cond
+    if mask is not None:
+        df = df[mask]
+    if limit:
+        df = df.tail(limit)
+    return df
+
+def _render(result, fmt: str, start, end, since, limit, max_points, headers):
+    """截取、降采样并序列化；在线程池中执行，不阻塞事件循环。"""
+    result = _slice_bars(result, start, end, since, limit)
+    result = downsample_ohlc(result, max_points)
+    return encode(result, fmt, headers=headers)
+
 @router.get("/kline/{code}")
-async def get_kline(code: str):
+async def get_kline(
+    request: Request,
+    code: str,
+    period: str = "D",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    since: Optional[str] = None,
+    max_points: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
     """
     获取股票 K 线图数据，支持多种股票代码格式。
+    period: D/W/M/Q/Y 分别对应日/周/月/季/年 K。
+    start/end: 日期区间（YYYY-MM-DD，含端点）；limit: 只返回最近 N 根；
+    周/月/季/年 K 先按完整历史聚合再按 K 线日期（周期内最后一个交易日）截取，
+    因此第一根 K 线仍是完整周期，可能包含 start 之前的交易日。
+    since: 只返回该日期之后新增的 K 线，供轮询增量拉取。
+    max_points: 结果超过该数量时做 OHLC 保真降采样（一般传图表像素宽度）。
+    format: records（默认）/ columnar / arrow，也可通过 Accept 头协商。
+    响应带数据集版本 ETag，If-None-Match 命中时返回 304。
     """
     try:
         norm_code = normalize_code(code)
+        period = period.upper()
+        if period not in PERIODS:
+            return JSONResponse({"error": f"不支持的周期: {period}，可选 {'/'.join(PERIODS)}"}, status_code=400)
+        if limit is not None and limit <= 0:
+            return JSONResponse({"error": "limit 必须为正整数"}, status_code=400)
+        if max_points is not None and max_points <= 0:
+            return JSONResponse({"error": "max_points 必须为正整数"}, status_code=400)
+        try:
+            fmt = negotiate(request, fmt)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        version = file_version(KLINE_PATH)
+        etag = make_etag(version, norm_code, period, start, end, limit, since, max_points, fmt)
+        if is_fresh(request, etag):
+            return not_modified(etag)
 
-        con = duckdb.connect()
-        query = f"""
-        SELECT date, open, close, high, low
-        FROM read_parquet('{KLINE_PATH}')
-        WHERE code = '{norm_code}'
-        """
-        result = con.execute(query).fetchdf()
-        con.close()
+        # 同一只股票的并发请求只触发一次加载
+        result = await FLIGHTS.do(("kline", norm_code, period, version), _load_bars, norm_code, period, version)
 
         if result.empty:
             return JSONResponse({"error": f"未找到股票代码: {norm_code}"}, status_code=404)
 
-        # 构造返回值
-        kline_data = [
-            {
-                "date": row["date"],
-                "open": float(row["open"]),
-                "close": float(row["close"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-            }
-            for _, row in result.iterrows()
-        ]
-
-        return kline_data
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        return await run_in_threadpool(_render, result, fmt, start, end, since, limit, max_points, headers)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+MAX_BATCH_CODES = 200
+
+class KlineBatchRequest(BaseModel):
+    codes: List[str]
+    start: Optional[str] = None
+    end: Optional[str] = None
+    period: str = "D"
+    max_points: Optional[int] = None  # 每只股票的最大返回根数
+
+def _render_batch(result, req: KlineBatchRequest, norm_codes: List[str], period: str, fmt: str):
+    """按代码分组降采样并序列化；在线程池中执行，不阻塞事件循环。"""
+    result = _slice_bars(result, req.start, req.end, None, None)
+    groups = {
+        code: downsample_ohlc(group.drop(columns="code"), req.max_points)
+        for code, group in result.groupby("code", sort=False)
+    }
+    if fmt == "arrow":
+        frames = [g.assign(code=code) for code, g in groups.items()]
+        return encode(pd.concat(frames, ignore_index=True) if frames else result, fmt)
+    data = {code: to_columns(group) for code, group in groups.items()}
+    return {
+        "period": period,
+        "data": data,
+        "missing": [c for c in norm_codes if c not in data],
+    }
+
+@router.post("/kline/batch")
+async def get_kline_batch(
+    request: Request,
+    req: KlineBatchRequest,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    """
+    批量获取多只股票的 K 线，一次扫描完成。
+    start/end 的截取规则与单只股票接口相同：先聚合完整周期，再按 K 线日期截取。
+    返回 {"period", "data": {code: 列式K线}, "missing": [未找到的代码]}；
+    format=arrow 时返回带 code 列的扁平 Arrow 表。
+    """
+    try:
+        period = req.period.upper()
+        if period not in PERIODS:
+            return JSONResponse({"error": f"不支持的周期: {period}，可选 {'/'.join(PERIODS)}"}, status_code=400)
+        if not req.codes or len(req.codes) > MAX_BATCH_CODES:
+            return JSONResponse({"error": f"codes 数量需在 1~{MAX_BATCH_CODES} 之间"}, status_code=400)
+        if req.max_points is not None and req.max_points <= 0:
+            return JSONResponse({"error": "max_points 必须为正整数"}, status_code=400)
+        try:
+            fmt = negotiate(request, fmt)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        norm_codes = list(dict.fromkeys(normalize_code(c) for c in req.codes))
+        result = await FLIGHTS.do(
+            ("kline_batch", tuple(norm_codes), period, file_version(KLINE_PATH)), _query_bars, norm_codes, period
+        )
+        return await run_in_threadpool(_render_batch, result, req, norm_codes, period, fmt)
 
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
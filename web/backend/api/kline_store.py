@@ -0,0 +1,97 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def index_path_for(parquet_path: str) -> str:
+    """all_klines.parquet -> all_klines.index.json（由 scripts/cluster_klines.py 生成）"""
+    return os.path.splitext(parquet_path)[0] + ".index.json"
+
+
+def _check_index(codes: Dict[str, List[int]], metadata: pq.FileMetaData) -> Optional[str]:
+    """校验索引与 parquet footer：返回不一致的原因，一致时返回 None。"""
+    names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+    if "code" not in names:
+        return "缺少 code 列"
+    col = names.index("code")
+    covered = 0
+    for code, (start, stop) in sorted(codes.items(), key=lambda item: item[1]):
+        if start != covered or stop <= start:
+            return f"{code} 的 row group 区间 [{start}, {stop}) 不连续"
+        for i in range(start, stop):
+            if i >= metadata.num_row_groups:
+                return f"{code} 的 row group {i} 超出文件范围"
+            s = metadata.row_group(i).column(col).statistics
+            if s is None or not s.has_min_max or s.min != code or s.max != code:
+                return f"row group {i} 不只包含 {code}"
+        covered = stop
+    if covered != metadata.num_row_groups:
+        return f"索引覆盖 {covered} 个 row group，文件有 {metadata.num_row_groups} 个"
+    return None
+
+
+class KlineStore:
+    """
+    按 code 聚簇的 K 线 parquet + 旁路索引。
+    索引与文件大小一致、且与 footer 统计吻合（row group 区间恰好覆盖全文件，
+    每个 row group 只含一个 code）时，单股查询只读取该股票所在的 row group；
+    否则，或请求的 code 不在索引中时，lookup 返回 None，由调用方退回全文件扫描。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.index_path = index_path_for(path)
+        self._lock = threading.Lock()
+        # (文件戳, code -> [起始 row group, 结束 row group), parquet footer)，整体原子替换
+        self._state: Tuple[Optional[tuple], Dict[str, List[int]], Optional[pq.FileMetaData]] = (None, {}, None)
+
+    def _load(self) -> Tuple[Dict[str, List[int]], Optional[pq.FileMetaData]]:
+        """文件变化时重新加载索引和 parquet footer。"""
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size, os.stat(self.index_path).st_mtime_ns)
+        except OSError:
+            return {}, None
+
+        state = self._state
+        if state[0] != stamp:
+            with self._lock:
+                state = self._state
+                if state[0] != stamp:
+                    codes, metadata = {}, None
+                    try:
+                        with open(self.index_path, encoding="utf-8") as f:
+                            index = json.load(f)
+                        if index.get("file_size") == st.st_size:
+                            metadata = pq.read_metadata(self.path)
+                            error = _check_index(index["codes"], metadata)
+                            if error is None:
+                                codes = index["codes"]
+                            else:
+                                print(f"[WARN] K线索引与文件不一致，退回全文件扫描: {error}")
+                                metadata = None
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"[WARN] K线索引不可用: {e}")
+                    state = self._state = (stamp, codes, metadata)
+        return state[1], state[2]
+
+    def lookup(self, codes: Iterable[str]) -> Optional[pa.Table]:
+        """按 code 读取对应 row group，索引不可用时返回 None。"""
+        index, metadata = self._load()
+        if metadata is None:
+            return None
+        groups: List[int] = []
+        for code in codes:
+            if code not in index:
+                return None
+            start, stop = index[code]
+            groups.extend(range(start, stop))
+        if not groups:
+            return metadata.schema.to_arrow_schema().empty_table()
+        pf = pq.ParquetFile(self.path, metadata=metadata)
+        return pf.read_row_groups(sorted(groups))
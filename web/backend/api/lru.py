@@ -0,0 +1,71 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class VersionedLRU:
+    """
+    有界 LRU 缓存，条目带 TTL 和数据集版本。
+    同一个键只保留一个版本：版本变化或超时的条目在读取时视为未命中并被新值替换。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (版本, 过期时间, 值)
+        self._data: "OrderedDict[Hashable, Tuple[str, float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0      # 因版本变化或超时失效
+        self.evictions = 0  # 因容量被挤出
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] == version and entry[1] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                del self._data[key]
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (version, time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_build(self, key: Hashable, version: str, build: Callable[..., Any], *args: Any) -> Any:
+        """命中直接返回；否则调用 build(*args)，结果为空（失败）时不缓存。"""
+        value = self.get(key, version)
+        if value is None:
+            value = build(*args)
+            if value:
+                self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
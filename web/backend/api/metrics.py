@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from typing import Any, Callable, Dict
+
+router = APIRouter()
+
+# 名称 -> 返回统计字典的函数，由各模块在导入时注册
+_PROVIDERS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    _PROVIDERS[name] = provider
+
+@router.get("/metrics")
+def get_metrics():
+    """各缓存 / 数据集的运行时统计（命中率、内存占用等）。"""
+    return {name: provider() for name, provider in _PROVIDERS.items()}
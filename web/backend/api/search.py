@@ -0,0 +1,128 @@
+from __future__ import annotations
+import re
+import threading
+import heapq
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from . import metrics
+from .db import POOL
+from .stocks import DETAILS
+
+try:  # 拼音首字母为可选功能，未安装 pypinyin 时跳过
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pragma: no cover
+    lazy_pinyin = None
+
+router = APIRouter()
+
+MAX_LIMIT = 50
+# 匹配类型权重：越小越靠前
+KIND_CODE, KIND_NAME, KIND_PINYIN = 0, 1, 2
+
+
+def _pinyin_initials(name: str) -> str:
+    if lazy_pinyin is None:
+        return ""
+    return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+
+
+def _code_keys(detail_code: str) -> Tuple[str, List[str]]:
+    """600000.SH -> (sh.600000, [600000, 600000.sh, 600000sh, sh.600000, sh600000])"""
+    m = re.fullmatch(r"(\d+)\.([A-Za-z]+)", detail_code)
+    if not m:
+        return detail_code, [detail_code.lower()]
+    digits, market = m.group(1), m.group(2).lower()
+    kline_code = f"{market}.{digits}"
+    return kline_code, [digits, f"{digits}.{market}", f"{digits}{market}", kline_code, f"{market}{digits}"]
+
+
+class SymbolIndex:
+    """
+    代码 / 名称 / 拼音首字母的前缀索引：所有键排序后存成数组，
+    查询时两次二分定位前缀区间 [lo, hi)，对区间内的键逐一打分后取前 limit 个。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (数据版本, 排序后的键, 键对应的 (类型, 条目下标), 条目)
+        self._state: Tuple[str, List[str], List[Tuple[int, int]], List[Dict[str, str]]] = ("", [], [], [])
+        self.builds = 0
+
+    def _current(self):
+        table = DETAILS.get()
+        state = self._state
+        if state[0] != DETAILS.version:
+            with self._lock:
+                state = self._state
+                if state[0] != DETAILS.version:
+                    state = self._state = self._build(table, DETAILS.version)
+                    self.builds += 1
+        return state
+
+    @staticmethod
+    def _build(table, version: str):
+        rows = POOL.fetchall(
+            'SELECT "证券代码", arg_max("证券名称", "年份") FROM details '
+            'WHERE "证券代码" IS NOT NULL GROUP BY 1 ORDER BY 1',
+            tables={"details": table},
+        )
+        entries: List[Dict[str, str]] = []
+        pairs: List[Tuple[str, int, int]] = []
+        for code, name in rows:
+            idx = len(entries)
+            name = name or ""
+            kline_code, code_keys = _code_keys(code)
+            entries.append({"code": code, "kline_code": kline_code, "name": name})
+            pairs.extend((key, KIND_CODE, idx) for key in code_keys)
+            if name:
+                pairs.append((name.lower(), KIND_NAME, idx))
+                initials = _pinyin_initials(name)
+                if initials:
+                    pairs.append((initials, KIND_PINYIN, idx))
+        pairs.sort()
+        return version, [p[0] for p in pairs], [(p[1], p[2]) for p in pairs], entries
+
+    def search(self, q: str, limit: int = 10) -> List[Dict[str, str]]:
+        q = q.strip().lower()
+        if not q:
+            return []
+        _, keys, refs, entries = self._current()
+        # 字典序并不保证较短的键在前（如 "paaa" < "pb"），须取出整个前缀区间再排序；
+        # 上界取 q 末字符加一，比 q + "\uffff" 更严格（名称中可能有 BMP 以外的字符）
+        lo = bisect_left(keys, q)
+        hi = bisect_left(keys, q[:-1] + chr(ord(q[-1]) + 1), lo)
+        best: Dict[int, tuple] = {}
+        for i in range(lo, hi):
+            key = keys[i]
+            kind, idx = refs[i]
+            score = (key != q, kind, len(key), entries[idx]["code"])
+            if idx not in best or score < best[idx]:
+                best[idx] = score
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda item: item[1])
+        return [dict(entries[idx], match=("exact" if not s[0] else "prefix")) for idx, s in ranked]
+
+    def stats(self):
+        _, keys, _, entries = self._state
+        return {"symbols": len(entries), "keys": len(keys), "builds": self.builds, "pinyin": lazy_pinyin is not None}
+
+
+SYMBOLS = SymbolIndex()
+metrics.register("search", SYMBOLS.stats)
+
+
+@router.get("/search")
+def search(q: str = "", limit: int = 10):
+    """
+    代码 / 名称 / 拼音首字母联想搜索，支持 600000、sh.600000、600000.SH 等格式。
+    排序：完全匹配 > 代码前缀 > 名称前缀 > 拼音前缀，同类中键越短越靠前。
+    """
+    if limit <= 0 or limit > MAX_LIMIT:
+        return JSONResponse({"error": f"limit 需在 1~{MAX_LIMIT} 之间"}, status_code=400)
+    try:
+        return SYMBOLS.search(q, limit)
+    except FileNotFoundError as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+
+
+class SingleFlight:
+    """
+    进程内请求合并：同一个键同时只执行一次计算，并发的调用方等待同一个结果。
+    计算在线程池中执行；首个调用方断开（被取消）不会中断计算，其余调用方照常拿到结果。
+    结果只在计算期间共享，完成后即释放，缓存仍由各模块自己负责。
+    返回值被多个请求共享，调用方不得修改。
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        self.calls += 1
+        future = self._calls.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(run_in_threadpool(fn, *args))
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        self._calls.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # 所有调用方都已断开时避免 "exception was never retrieved" 警告
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._calls),
+        }
+
+
+# 全局实例，键的第一项约定为调用方名称（如 "kline"、"stock_context"）避免冲突
+FLIGHTS = SingleFlight()
+metrics.register("singleflight", FLIGHTS.stats)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from . import metrics
+
+# 可通过环境变量调整：SSE_FLUSH_MS 为 0 时每个片段单独发送
+FLUSH_MS = float(os.getenv("SSE_FLUSH_MS", "30"))
+FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", "1024"))
+HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+
+HEARTBEAT = ": ping\n\n"
+RATE_WINDOW = 10  # 速率统计窗口（秒）
+
+
+def sse_frame(content: str) -> str:
+    return f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+
+
+class StreamStats:
+    """SSE 流的帧数 / 片段数 / 心跳统计，速率按最近 RATE_WINDOW 秒计算。"""
+
+    def __init__(self) -> None:
+        self.streams = 0
+        self.active = 0
+        self.deltas = 0
+        self.frames = 0
+        self.heartbeats = 0
+        self.bytes = 0
+        # 每秒一个桶：[秒, 帧数, 片段数]
+        self._buckets: Deque[List[int]] = deque(maxlen=RATE_WINDOW + 1)
+
+    def _bucket(self) -> List[int]:
+        now = int(time.monotonic())
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_deltas(self, n: int) -> None:
+        self.deltas += n
+        self._bucket()[2] += n
+
+    def record_frame(self, size: int) -> None:
+        self.frames += 1
+        self.bytes += size
+        self._bucket()[1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        # 只统计已结束的整秒，避免当前秒的桶拉低速率
+        now = int(time.monotonic())
+        recent = [b for b in self._buckets if now - RATE_WINDOW <= b[0] < now]
+        return {
+            "flush_ms": FLUSH_MS,
+            "flush_bytes": FLUSH_BYTES,
+            "streams": self.streams,
+            "active": self.active,
+            "deltas": self.deltas,
+            "frames": self.frames,
+            "heartbeats": self.heartbeats,
+            "bytes": self.bytes,
+            "deltas_per_frame": round(self.deltas / self.frames, 2) if self.frames else None,
+            "frames_per_s": round(sum(b[1] for b in recent) / RATE_WINDOW, 2),
+            "deltas_per_s": round(sum(b[2] for b in recent) / RATE_WINDOW, 2),
+        }
+
+
+STATS = StreamStats()
+metrics.register("sse", STATS.stats)
+
+
+async def _next(it: AsyncIterator[str]) -> str:
+    return await it.__anext__()
+
+
+async def coalesce(
+    deltas: AsyncIterator[str],
+    *,
+    flush_ms: float = FLUSH_MS,
+    flush_bytes: int = FLUSH_BYTES,
+    heartbeat: float = HEARTBEAT_S,
+    stats: Optional[StreamStats] = STATS,
+) -> AsyncIterator[str]:
+    """
+    把上游的文本片段合并成 SSE 帧：
+    距上次发送已超过 flush_ms 的片段（包括首个片段）立即发送，不增加首 token 延迟；
+    之后的片段先缓冲，到时间窗口末尾或缓冲超过 flush_bytes 字节时一并发送。
+    上游长时间没有输出时发送 SSE 注释行作为心跳，防止代理断开空闲连接。
+    """
+    window = flush_ms / 1000
+    loop = asyncio.get_running_loop()
+    it = deltas.__aiter__()
+    buf: List[str] = []
+    size = 0
+    last_flush = -float("inf")
+    deadline: Optional[float] = None  # 缓冲区最迟发送时刻
+    pending: Optional[asyncio.Future] = asyncio.ensure_future(_next(it))
+    if stats:
+        stats.streams += 1
+        stats.active += 1
+
+    def flush() -> str:
+        nonlocal buf, size, last_flush, deadline
+        frame = sse_frame("".join(buf))
+        if stats:
+            stats.record_deltas(len(buf))
+            stats.record_frame(len(frame))
+        buf, size, last_flush, deadline = [], 0, loop.time(), None
+        return frame
+
+    try:
+        while True:
+            if not pending.done():
+                timeout = heartbeat if deadline is None else max(0.0, deadline - loop.time())
+                await asyncio.wait({pending}, timeout=timeout)
+            if not pending.done():
+                if buf:
+                    yield flush()
+                else:
+                    if stats:
+                        stats.heartbeats += 1
+                    yield HEARTBEAT
+                continue
+
+            done, pending = pending, None
+            try:
+                delta = done.result()
+            except StopAsyncIteration:
+                break
+            pending = asyncio.ensure_future(_next(it))
+            if not delta:
+                continue
+            buf.append(delta)
+            size += len(delta.encode("utf-8"))
+            now = loop.time()
+            if size >= flush_bytes or now - last_flush >= window:
+                yield flush()
+            elif deadline is None:
+                deadline = last_flush + window
+        if buf:
+            yield flush()
+    finally:
+        if stats:
+            stats.active -= 1
+        if pending is not None:
+            pending.cancel()
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                pending.exception()  # 取出异常，避免 "exception was never retrieved" 警告
+        aclose = getattr(it, "aclose", None)
+        if aclose is not None:
+            await aclose()
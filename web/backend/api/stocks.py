@@ -1,13 +1,135 @@
-from fastapi import APIRouter
-import duckdb
-import os
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+from . import metrics
+from .catalog import CATALOG
+from .conditional import CACHE_CONTROL, is_fresh, not_modified, request_etag
+from .dataset import DatasetCache
+from .db import POOL, file_version
+from .formats import encode, negotiate
+from .singleflight import FLIGHTS
 
 router = APIRouter()
 
+DETAILS_PATH = CATALOG.path("details")
+# details.parquet 的内存快照，文件变化时自动重新加载
+DETAILS = DatasetCache(DETAILS_PATH)
+metrics.register("details", DETAILS.stats)
+
+# 排序字段（前端字段名 -> details.parquet 列名）
+SORT_COLUMNS = {
+    "code": "证券代码",
+    "name": "证券名称",
+    "year": "年份",
+    "annual_return": "年涨跌幅",
+    "max_drawdown": "最大回撤",
+    "pe_ratio": "市盈率",
+    "pb_ratio": "市净率",
+    "sharpe_ratio": "夏普比率-普通收益率-日-一年定存利率",
+}
+
+def _num(col: str) -> str:
+    return f'TRY_CAST("{col}" AS DOUBLE)'
+
+def _int(col: str) -> str:
+    return f'TRY_CAST("{col}" AS INTEGER)'
+
+def _range_filter(col: str, op: str) -> str:
+    """与前端原有逻辑一致：数值缺失（NULL/NaN）的行不参与该条件过滤。"""
+    x = _num(col)
+    return f"({x} IS NULL OR isnan({x}) OR {x} {op} ?)"
+
+# 年份可能存为字符串或浮点数（2020.0），统一按整数比较；参数传年份字符串
+YEAR_FILTER = f"{_int('年份')} = TRY_CAST(? AS INTEGER)"
+
+def _query_page(query: str, count_query: str, params: list, page_params: list):
+    """返回 (当前页, 总条数)。"""
+    tables = {"details": DETAILS.get()}
+    df = POOL.fetchdf(query, params + page_params, tables=tables)
+    if not df.empty:
+        total = int(df["__total"].iloc[0])
+    else:
+        # 当前页为空（如 offset 越界）时单独统计总数
+        total = POOL.fetchall(count_query, params, tables=tables)[0][0]
+    return df.drop(columns="__total"), total
+
 @router.get("/stocks")
-def get_stocks():
-    path = os.path.join("data", "data_analysis", "details.parquet")
-    query = f"SELECT * FROM '{path}'"
-    df = duckdb.query(query).to_df()
-    return df.to_dict(orient="records")
-   
\ No newline at end of file
+async def get_stocks(
+    request: Request,
+    code: Optional[List[str]] = Query(None),
+    year: Optional[str] = None,
+    annual_return: Optional[float] = None,
+    max_drawdown: Optional[float] = None,
+    pe_ratio: Optional[float] = None,
+    pb_ratio: Optional[float] = None,
+    sharpe_ratio: Optional[float] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    """
+    个股年度数据，筛选条件下推到 DuckDB：
+    year / code 精确匹配（code 可重复传入多个，如联想搜索的结果）；annual_return、sharpe_ratio 为下限；max_drawdown、pe_ratio、pb_ratio 为上限。
+    sort/order/offset/limit 分页，总条数通过 X-Total-Count 响应头返回。
+    """
+    try:
+        fmt = negotiate(request, fmt)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if sort is not None and sort not in SORT_COLUMNS:
+        return JSONResponse({"error": f"不支持的排序字段: {sort}，可选 {'/'.join(SORT_COLUMNS)}"}, status_code=400)
+    if order.lower() not in ("asc", "desc"):
+        return JSONResponse({"error": "order 只能为 asc 或 desc"}, status_code=400)
+    if offset < 0 or (limit is not None and limit <= 0):
+        return JSONResponse({"error": "offset 不能为负，limit 必须为正整数"}, status_code=400)
+
+    version = file_version(DETAILS_PATH)
+    etag = request_etag(request, version, fmt)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    where, params = [], []
+    if code:
+        where.append(f'"证券代码" IN ({", ".join("?" * len(code))})')
+        params.extend(code)
+    if year:
+        where.append(YEAR_FILTER)
+        params.append(str(year))
+    for value, col, op in (
+        (annual_return, "年涨跌幅", ">="),
+        (max_drawdown, "最大回撤", "<="),
+        (pe_ratio, "市盈率", "<="),
+        (pb_ratio, "市净率", "<="),
+        (sharpe_ratio, "夏普比率-普通收益率-日-一年定存利率", ">="),
+    ):
+        if value is not None:
+            where.append(_range_filter(col, op))
+            params.append(value)
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    order_sql = ""
+    if sort:
+        col = SORT_COLUMNS[sort]
+        key = f'"{col}"' if sort in ("code", "name", "year") else _num(col)
+        order_sql = f"ORDER BY {key} {order.upper()} NULLS LAST"
+    page_sql = ""
+    if limit is not None:
+        page_sql = "LIMIT ? OFFSET ?"
+    elif offset:
+        page_sql = "OFFSET ?"
+
+    query = f"SELECT *, count(*) OVER () AS __total FROM details {where_sql} {order_sql} {page_sql}"
+    page_params = ([limit, offset] if limit is not None else [offset] if offset else [])
+    count_query = f"SELECT count(*) FROM details {where_sql}"
+    # 相同筛选条件的并发请求合并为一次查询
+    df, total = await FLIGHTS.do(
+        ("stocks", version, query, tuple(params + page_params)),
+        _query_page, query, count_query, params, page_params,
+    )
+    # 序列化可能较慢（未分页的全量结果），放到线程池中执行，不阻塞事件循环
+    headers = {"X-Total-Count": str(total), "ETag": etag, "Cache-Control": CACHE_CONTROL}
+    return await run_in_threadpool(encode, df, fmt, headers)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import re
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 指标名 -> 默认周期；expma 为 ema 的别名，macd 固定 (12, 26, 9)
+DEFAULT_WINDOWS = {"ma": 5, "ema": 12, "macd": 0, "rsi": 14, "boll": 20, "atr": 14}
+ALIASES = {"expma": "ema"}
+_TOKEN = re.compile(r"([a-z]+)(\d*)")
+
+Spec = Tuple[Tuple[str, int], ...]
+
+
+def parse_indicators(text: str) -> Spec:
+    """'ma5,ma20,macd,rsi' -> 规范化、去重、排序后的 ((名称, 周期), ...)，可直接作为缓存键。"""
+    specs = set()
+    for token in filter(None, (t.strip().lower() for t in text.split(","))):
+        m = _TOKEN.fullmatch(token)
+        name = ALIASES.get(m.group(1), m.group(1)) if m else None
+        if name not in DEFAULT_WINDOWS:
+            raise ValueError(f"不支持的指标: {token}，可选 {'/'.join(DEFAULT_WINDOWS)}")
+        window = int(m.group(2)) if m.group(2) else DEFAULT_WINDOWS[name]
+        if name != "macd" and window <= 0:
+            raise ValueError(f"指标周期必须为正整数: {token}")
+        specs.add((name, 0 if name == "macd" else window))
+    return tuple(sorted(specs))
+
+
+def _ema(s: pd.Series, span: int) -> pd.Series:
+    return s.ewm(span=span, adjust=False).mean()
+
+
+def _wilder(s: pd.Series, n: int) -> pd.Series:
+    return s.ewm(alpha=1 / n, adjust=False, min_periods=n).mean()
+
+
+def compute_indicators(bars: pd.DataFrame, specs: Spec) -> pd.DataFrame:
+    """
+    在同一份按日期升序的 K 线上一次性计算全部指标（向量化，无逐行循环）。
+    共用的中间量（收盘价、前收、EMA12/26 等）只计算一次。
+    """
+    close = bars["close"]
+    out: Dict[str, pd.Series] = {"date": bars["date"]}
+    shared: Dict[str, pd.Series] = {}
+
+    def prev_close() -> pd.Series:
+        if "prev_close" not in shared:
+            shared["prev_close"] = close.shift(1)
+        return shared["prev_close"]
+
+    def ema(span: int) -> pd.Series:
+        key = f"ema{span}"
+        if key not in shared:
+            shared[key] = _ema(close, span)
+        return shared[key]
+
+    for name, n in specs:
+        if name == "ma":
+            out[f"ma{n}"] = close.rolling(n).mean()
+        elif name == "ema":
+            out[f"ema{n}"] = ema(n)
+        elif name == "macd":
+            dif = ema(12) - ema(26)
+            dea = _ema(dif, 9)
+            out["macd_dif"], out["macd_dea"], out["macd_hist"] = dif, dea, 2 * (dif - dea)
+        elif name == "rsi":
+            delta = close - prev_close()
+            gain = _wilder(delta.clip(lower=0), n)
+            loss = _wilder(-delta.clip(upper=0), n)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[f"rsi{n}"] = 100 - 100 / (1 + gain / loss)
+        elif name == "boll":
+            mid = close.rolling(n).mean()
+            std = close.rolling(n).std(ddof=0)
+            out[f"boll{n}_mid"], out[f"boll{n}_upper"], out[f"boll{n}_lower"] = mid, mid + 2 * std, mid - 2 * std
+        elif name == "atr":
+            pc = prev_close()
+            tr = pd.concat(
+                [bars["high"] - bars["low"], (bars["high"] - pc).abs(), (bars["low"] - pc).abs()], axis=1
+            ).max(axis=1)
+            out[f"atr{n}"] = _wilder(tr, n)
+
+    return pd.DataFrame(out).replace([np.inf, -np.inf], np.nan)
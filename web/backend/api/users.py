@@ -1,23 +1,126 @@
-from fastapi import APIRouter
-import duckdb
-import os
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse
+from typing import Optional
+import base64
+import json
+
+import pandas as pd
+
+from .catalog import CATALOG
+from .conditional import CACHE_CONTROL, is_fresh, not_modified, request_etag
+from .db import POOL, file_version
+from .formats import FORMATS, encode, negotiate, stream_ndjson
 
 router = APIRouter()
 
+USER_SUMMARY_PATH = CATALOG.path("user_summary")
+ORDER_BOOK_PATH = CATALOG.path("order_book")
+
 @router.get("/users")
-def get_users():
-    conn = duckdb.connect(database=':memory:')
-    path = os.path.join("data", "order_book", "user_summary.parquet")
-    query = f"SELECT * FROM '{path}'"
-    df = conn.query(query).to_df()
-    conn.close()
-    return df.to_dict(orient="records")
+def get_users(request: Request, fmt: Optional[str] = Query(None, alias="format")):
+    """用户汇总（user_summary.parquet，由离线流程生成，接口只读）。"""
+    try:
+        fmt = negotiate(request, fmt)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    etag = request_etag(request, file_version(USER_SUMMARY_PATH), fmt)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    df = POOL.fetchdf(f"SELECT * FROM {CATALOG.view('user_summary')}")
+    return encode(df, fmt, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+MAX_PAGE_SIZE = 10000
+DEFAULT_PAGE_SIZE = 1000
+
+def _encode_cursor(time, row: int) -> str:
+    # time 为空（NULL / NaT）时游标中记为 null
+    raw = json.dumps([None if pd.isna(time) else str(time), int(row)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        time, row = json.loads(raw)
+        return None if time is None else str(time), int(row)
+    except (ValueError, TypeError) as e:
+        raise ValueError("cursor 无效") from e
 
 @router.get("/order_book")
-def get_order_book():
-    conn = duckdb.connect(database=':memory:')
-    path = os.path.join("data", "order_book", "order_book.parquet")
-    query = f"SELECT * FROM '{path}'"
-    df = conn.query(query).to_df()
-    conn.close()
-    return df.to_dict(orient="records")
+def get_order_book(
+    request: Request,
+    user: Optional[str] = None,
+    code: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    result: Optional[str] = None,
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
+):
+    """
+    订单簿查询，user / code / result 精确匹配，start / end 为 time 区间（含端点），均下推到 parquet 扫描。
+    - 按 (time, 行号) 游标分页，time 为空的行无论升降序都排在最后；每页 limit 行（默认 DEFAULT_PAGE_SIZE），下一页游标在 X-Next-Cursor 响应头中；
+    - format=ndjson（或 Accept: application/x-ndjson）时按 record batch 流式输出全部匹配行：
+      未传 cursor 且 order=asc 时按文件顺序输出，不排序，内存占用与总行数无关；
+      否则需要 DuckDB 先完成排序才能输出第一批。
+    """
+    try:
+        fmt = negotiate(request, fmt, allowed=FORMATS + ("ndjson",))
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if order.lower() not in ("asc", "desc"):
+        return JSONResponse({"error": "order 只能为 asc 或 desc"}, status_code=400)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        return JSONResponse({"error": f"limit 需在 1~{MAX_PAGE_SIZE} 之间"}, status_code=400)
+
+    etag = request_etag(request, file_version(ORDER_BOOK_PATH), fmt)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    where, params = [], []
+    for col, value in (("user", user), ("code", code), ("result", result)):
+        if value is not None:
+            where.append(f'"{col}" = ?')
+            params.append(value)
+    if start is not None:
+        where.append("time >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("time <= ?")
+        params.append(end)
+    desc = order.lower() == "desc"
+    if after is not None:
+        op = "<" if desc else ">"
+        if after[0] is None:
+            where.append(f"(time IS NULL AND file_row_number {op} ?)")
+            params.append(after[1])
+        else:
+            where.append(f"(time {op} ? OR time IS NULL OR (time = ? AND file_row_number {op} ?))")
+            params.extend([after[0], after[0], after[1]])
+
+    direction = "DESC" if desc else "ASC"
+    # 游标分页依赖 file_row_number，直接扫描文件而不走 catalog 视图
+    literal = ORDER_BOOK_PATH.replace("'", "''")
+    scan = (
+        f"SELECT * FROM read_parquet('{literal}', file_row_number = true) "
+        f"{'WHERE ' + ' AND '.join(where) if where else ''}"
+    )
+    order_sql = f" ORDER BY time {direction} NULLS LAST, file_row_number {direction}"
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if fmt == "ndjson":
+        # 不需要排序时按文件顺序边扫描边输出
+        query = scan if after is None and not desc else scan + order_sql
+        batches = POOL.iter_batches(f"SELECT * EXCLUDE (file_row_number) FROM ({query})", params)
+        return stream_ndjson(batches, headers=headers)
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    # 多取一行判断是否还有下一页
+    df = POOL.fetchdf(scan + order_sql + " LIMIT ?", params + [page_size + 1])
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(last["time"], last["file_row_number"])
+    return encode(df.drop(columns="file_row_number"), fmt, headers=headers)
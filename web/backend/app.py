@@ -1,8 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api import chat, users, stocks, kline
+from api import chat, users, stocks, kline, indicators, metrics, search
+from api.catalog import CATALOG
+from api.compression import CompressionMiddleware
+from api.deepseek import close_async_client
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时把各 parquet 注册为 DuckDB 视图
+    CATALOG.startup()
+    yield
+    # 关闭时释放 DeepSeek 连接池与会话数据库
+    await close_async_client()
+    chat.CONVERSATIONS.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 配置，允许前端访问
 app.add_middleware(
@@ -11,13 +24,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag", "Retry-After"],
 )
 
+# gzip / zstd 响应压缩（SSE 不压缩）
+app.add_middleware(CompressionMiddleware)
+
 # 路由注册
 app.include_router(chat.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(stocks.router, prefix="/api")
 app.include_router(kline.router, prefix="/api") 
+app.include_router(indicators.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 
 @app.get("/")
 def root():
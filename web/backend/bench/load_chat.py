@@ -0,0 +1,157 @@
+"""
+聊天接口 SSE 压测
+并发打开 N 条 /api/chat/* 流，统计首 token 延迟（TTFT）、token 间隔、总耗时、
+吞吐量与错误率，可设置阈值作为发布门禁（超出时退出码为 1）。
+
+用法（在 web/backend 下，配合 bench/mock_llm.py 离线运行）:
+    python -m bench.load_chat --url http://127.0.0.1:8000/api/chat/stock \\
+        --stock-id 000001.SZ --concurrency 200 --requests 1000 --max-ttft-p95 800 --max-error-rate 0.01
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+ERROR_PREFIX = "【请求错误】"  # DeepSeekClient 把上游错误写进回复内容
+
+
+@dataclass
+class StreamResult:
+    ok: bool = False
+    error: Optional[str] = None
+    ttft: Optional[float] = None       # 秒
+    total: Optional[float] = None
+    gaps: List[float] = field(default_factory=list)
+    chunks: int = 0
+
+
+def percentiles(values: List[float], ps=(50, 90, 95, 99)) -> Dict[str, Optional[float]]:
+    """最近秩法百分位，单位转换为毫秒。"""
+    if not values:
+        return {f"p{p}": None for p in ps} | {"max": None}
+    ordered = sorted(values)
+    out = {}
+    for p in ps:
+        idx = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        out[f"p{p}"] = round(ordered[idx] * 1000, 2)
+    out["max"] = round(ordered[-1] * 1000, 2)
+    return out
+
+
+async def run_stream(client: httpx.AsyncClient, url: str, payload: dict) -> StreamResult:
+    result = StreamResult()
+    start = time.perf_counter()
+    last = None
+    try:
+        async with client.stream("POST", url, json=payload) as resp:
+            if resp.status_code != 200:
+                result.error = f"http_{resp.status_code}"
+                return result
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data.strip() == "[DONE]":
+                    result.ok = result.error is None
+                    break
+                content = json.loads(data).get("content", "")
+                if ERROR_PREFIX in content:  # 服务端合并片段后错误信息可能跟在正文后面
+                    result.error = "upstream"
+                    continue
+                now = time.perf_counter()
+                if last is None:
+                    result.ttft = now - start
+                else:
+                    result.gaps.append(now - last)
+                last = now
+                result.chunks += 1
+            else:
+                result.error = result.error or "truncated"
+    except (httpx.HTTPError, json.JSONDecodeError) as exc:
+        result.error = type(exc).__name__
+    finally:
+        result.total = time.perf_counter() - start
+    return result
+
+
+async def run_load(
+    url: str, payload: dict, concurrency: int, requests: int, timeout: float, unique: bool = False,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> dict:
+    """transport 可替换为 httpx.ASGITransport，在进程内直接压测应用（测试用）。"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(timeout), transport=transport) as client:
+        async def one(i: int) -> StreamResult:
+            async with sem:
+                body = dict(payload, message=f"{payload['message']} #{i}") if unique else payload
+                return await run_stream(client, url, body)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r.ok]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error or "unknown"] = errors.get(r.error or "unknown", 0) + 1
+    chunks = sum(r.chunks for r in ok)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / requests, 4) if requests else 0.0,
+        "errors": errors,
+        "ttft_ms": percentiles([r.ttft for r in ok if r.ttft is not None]),
+        "inter_token_ms": percentiles([g for r in ok for g in r.gaps]),
+        "total_ms": percentiles([r.total for r in ok]),
+        "throughput": {
+            "streams_per_s": round(len(ok) / elapsed, 2) if elapsed else None,
+            "chunks_per_s": round(chunks / elapsed, 2) if elapsed else None,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="聊天 SSE 接口压测")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/chat/stock")
+    parser.add_argument("--message", default="分析这只股票的趋势")
+    parser.add_argument("--stock-id", default="000001.SZ")
+    parser.add_argument("--year", default=None)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--unique", action="store_true", help="每个请求消息不同，避开回复缓存")
+    parser.add_argument("--max-ttft-p95", type=float, default=None, help="TTFT p95 上限（毫秒）")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="错误率上限")
+    args = parser.parse_args()
+
+    payload = {"message": args.message, "history": [], "stock_id": args.stock_id, "year": args.year}
+    report = asyncio.run(
+        run_load(args.url, payload, args.concurrency, args.requests, args.timeout, unique=args.unique)
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failed = []
+    p95 = report["ttft_ms"]["p95"]
+    if args.max_ttft_p95 is not None and (p95 is None or p95 > args.max_ttft_p95):
+        failed.append(f"TTFT p95 {p95}ms > {args.max_ttft_p95}ms")
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        failed.append(f"错误率 {report['error_rate']} > {args.max_error_rate}")
+    if failed:
+        print("未通过: " + "; ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+本地 mock LLM 服务
+模拟 DeepSeek /chat/completions 接口（stream 与非 stream），可配置首 token 延迟、
+token 速率与错误注入，用于离线压测聊天接口。
+
+用法（在 web/backend 下）:
+    python -m bench.mock_llm --port 9000 --tokens 200 --rate 40 --first-token-ms 300 --error-rate 0.02
+    DEEPSEEK_BASE_URL=http://127.0.0.1:9000/v1 DEEPSEEK_API_KEY=mock uvicorn app:app
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKENS = "市场短期震荡，量能温和放大，关注支撑位附近的企稳信号，注意控制仓位与回撤。"
+
+
+@dataclass
+class MockConfig:
+    tokens: int = 200              # 每次回复的 token 数
+    rate: float = 40.0             # 每条流的 token 速率（个/秒），0 表示不限速
+    first_token_ms: float = 300.0  # 首 token 延迟
+    jitter: float = 0.2            # 延迟的随机抖动比例
+    error_rate: float = 0.0        # 直接返回 HTTP 错误的比例
+    error_status: int = 500
+    abort_rate: float = 0.0        # 流式输出中途断开的比例
+    seed: int = 0
+
+
+def _delay(base: float, cfg: MockConfig, rng: random.Random) -> float:
+    return max(0.0, base * (1 + rng.uniform(-cfg.jitter, cfg.jitter)))
+
+
+def _chunk(i: int, content: str, model: str) -> str:
+    data = {
+        "id": f"mock-{i}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def create_app(cfg: MockConfig) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(cfg.seed or None)
+    stats = {"requests": 0, "errors": 0, "aborts": 0, "active": 0}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        stats["requests"] += 1
+        if rng.random() < cfg.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "injected error"}}, status_code=cfg.error_status)
+
+        n = min(cfg.tokens, body.get("max_tokens") or cfg.tokens)
+        abort_at = rng.randrange(1, max(n, 2)) if rng.random() < cfg.abort_rate else None
+        gap = 1.0 / cfg.rate if cfg.rate > 0 else 0.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(_delay(cfg.first_token_ms / 1000 + gap * n, cfg, rng))
+            text = "".join(TOKENS[i % len(TOKENS)] for i in range(n))
+            return {"model": model, "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+
+        async def stream():
+            stats["active"] += 1
+            try:
+                await asyncio.sleep(_delay(cfg.first_token_ms / 1000, cfg, rng))
+                for i in range(n):
+                    if i == abort_at:
+                        stats["aborts"] += 1
+                        raise ConnectionResetError("injected abort")
+                    if i and gap:
+                        await asyncio.sleep(_delay(gap, cfg, rng))
+                    yield _chunk(i, TOKENS[i % len(TOKENS)], model)
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["active"] -= 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地 mock LLM（/chat/completions）服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--tokens", type=int, default=MockConfig.tokens)
+    parser.add_argument("--rate", type=float, default=MockConfig.rate)
+    parser.add_argument("--first-token-ms", type=float, default=MockConfig.first_token_ms)
+    parser.add_argument("--jitter", type=float, default=MockConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--error-status", type=int, default=MockConfig.error_status)
+    parser.add_argument("--abort-rate", type=float, default=MockConfig.abort_rate)
+    parser.add_argument("--seed", type=int, default=MockConfig.seed)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    cfg = MockConfig(**{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
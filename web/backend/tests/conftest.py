@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试从 web/backend 或仓库根目录运行都能以 `api.xxx` 导入后端模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from api.admission import PRIORITY_STOCK, PRIORITY_STRATEGY, AdmissionController, Overloaded, Slot
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_grants_immediately_below_limit():
+    async def main():
+        ctl = AdmissionController(max_in_flight=2)
+        a = await ctl.acquire("u1")
+        b = await ctl.acquire("u2")
+        assert ctl.in_flight == 2
+        a.release()
+        a.release()  # 重复释放无副作用
+        b.release()
+        assert ctl.in_flight == 0
+        assert ctl.stats()["admitted"] == 2
+
+    run(main())
+
+
+def test_priority_then_round_robin_between_users():
+    async def main():
+        ctl = AdmissionController(max_in_flight=1, max_wait=5)
+        holder = await ctl.acquire("x")
+        order = []
+
+        async def wait(user, priority):
+            slot = await ctl.acquire(user, priority)
+            order.append(user)
+            slot.release()
+
+        tasks = [asyncio.create_task(wait(u, p)) for u, p in [
+            ("s1", PRIORITY_STRATEGY), ("a", PRIORITY_STOCK), ("a", PRIORITY_STOCK),
+            ("a", PRIORITY_STOCK), ("b", PRIORITY_STOCK),
+        ]]
+        await _settle()
+        assert ctl.stats()["queued"] == {"stock": 4, "strategy": 1}
+        holder.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert run(main()) == ["a", "b", "a", "a", "s1"]
+
+
+def test_rejects_when_queues_are_full():
+    async def main():
+        ctl = AdmissionController(max_in_flight=1, max_queue=3, max_queue_per_user=2, max_wait=5)
+        holder = await ctl.acquire("x")
+        waiters = [asyncio.create_task(ctl.acquire("u1")) for _ in range(2)]
+        await _settle()
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("u1")
+        assert e.value.reason == "user_queue_full"
+        waiters.append(asyncio.create_task(ctl.acquire("u2")))
+        await _settle()
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("u3")
+        assert e.value.reason == "queue_full"
+        assert 1 <= e.value.retry_after <= 60
+        for t in waiters:
+            t.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert ctl.queued == 0
+        holder.release()
+        assert ctl.in_flight == 0
+
+    run(main())
+
+
+def test_wait_timeout_leaves_queue_clean():
+    async def main():
+        ctl = AdmissionController(max_in_flight=1, max_wait=0.01)
+        holder = await ctl.acquire("x")
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("u1")
+        assert e.value.reason == "wait_timeout"
+        assert ctl.queued == 0 and ctl.timeouts == 1
+        holder.release()
+        assert ctl.in_flight == 0
+
+    run(main())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def main():
+        ctl = AdmissionController(max_in_flight=1, max_wait=5)
+        holder = await ctl.acquire("x")
+        waiter = asyncio.create_task(ctl.acquire("u1"))
+        await _settle()
+        holder.release()  # 名额交给 waiter 后它立即被取消
+        waiter.cancel()
+        (result,) = await asyncio.gather(waiter, return_exceptions=True)
+        # Python 3.11 的 wait_for 在结果已就绪时会吞掉取消并返回名额，3.12 起抛出 CancelledError 并由 acquire 归还；
+        # 两种情况下名额都不能丢失
+        if isinstance(result, Slot):
+            assert ctl.in_flight == 1
+            result.release()
+        else:
+            assert isinstance(result, asyncio.CancelledError)
+        assert ctl.in_flight == 0
+        assert ctl.queued == 0
+
+    run(main())
+
+
+def test_timeout_racing_grant_returns_slot(monkeypatch):
+    async def main():
+        ctl = AdmissionController(max_in_flight=1, max_wait=5)
+        holder = await ctl.acquire("x")
+
+        async def wait_for(future, timeout):
+            # 模拟超时触发的同时名额刚好分配给了该等待者
+            holder.release()
+            assert future.done()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", wait_for)
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("u1")
+        assert e.value.reason == "wait_timeout"
+        assert ctl.in_flight == 0 and ctl.queued == 0
+
+    run(main())
@@ -0,0 +1,19 @@
+import importlib
+
+
+def test_lifespan_registers_datasets_and_closes_clients(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app_module = importlib.import_module("app")
+    from fastapi.testclient import TestClient
+
+    calls = []
+    monkeypatch.setattr(app_module.CATALOG, "startup", lambda: calls.append("startup"))
+
+    async def close():
+        calls.append("close")
+
+    monkeypatch.setattr(app_module, "close_async_client", close)
+    with TestClient(app_module.app) as client:
+        assert calls == ["startup"]
+        assert client.get("/").json() == {"message": "Backend is running."}
+    assert calls == ["startup", "close"]
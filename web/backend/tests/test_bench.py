@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from api import chat, deepseek
+from api.admission import AdmissionController
+from bench.load_chat import percentiles, run_load
+from bench.mock_llm import MockConfig, create_app
+
+
+@pytest.fixture
+def chat_app(monkeypatch):
+    """聊天路由 + 进程内 mock 上游（不开端口）。"""
+
+    def build(cfg):
+        mock = create_app(cfg)
+        monkeypatch.setenv("DEEPSEEK_BASE_URL", "http://mock/v1")
+        monkeypatch.setattr(deepseek, "_ASYNC_CLIENT", httpx.AsyncClient(transport=httpx.ASGITransport(mock)))
+        monkeypatch.setattr(chat, "_build_stock_context", lambda stock_id, year=None: "【测试上下文】")
+        monkeypatch.setattr(chat, "ADMISSION", AdmissionController(max_in_flight=4))
+        app = FastAPI()
+        app.include_router(chat.router, prefix="/api")
+        return app
+
+    return build
+
+
+def _load(app, requests=6):
+    payload = {"message": "分析趋势", "history": [], "stock_id": "000001.SZ", "year": None}
+    return asyncio.run(run_load(
+        "http://app/api/chat/stock", payload, concurrency=3, requests=requests, timeout=10,
+        unique=True, transport=httpx.ASGITransport(app),
+    ))
+
+
+def test_driver_against_mock(chat_app):
+    report = _load(chat_app(MockConfig(tokens=20, rate=0, first_token_ms=0)))
+    assert report["ok"] == report["requests"] == 6
+    assert report["error_rate"] == 0.0 and report["errors"] == {}
+    assert report["ttft_ms"]["p50"] is not None
+
+
+def test_driver_counts_injected_upstream_errors(chat_app):
+    report = _load(chat_app(MockConfig(tokens=20, rate=0, first_token_ms=0, error_rate=1.0)), requests=3)
+    assert report["ok"] == 0
+    assert report["errors"] == {"upstream": 3}
+
+
+def test_percentiles_nearest_rank():
+    assert percentiles([]) == {"p50": None, "p90": None, "p95": None, "p99": None, "max": None}
+    p = percentiles([i / 1000 for i in range(1, 101)])
+    assert (p["p50"], p["p95"], p["max"]) == (50.0, 95.0, 100.0)
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from api import chat
+from api.dataset import DatasetCache
+
+
+@pytest.fixture
+def details(tmp_path, monkeypatch):
+    path = str(tmp_path / "details.parquet")
+    pd.DataFrame({
+        "证券代码": ["600000.SH", "600000.SH", "000001.SZ"],
+        "证券名称": ["浦发银行", "浦发银行", "平安银行"],
+        "年份": [2020.0, 2021.0, 2020.0],
+    }).to_parquet(path)
+    monkeypatch.setattr(chat, "DETAILS", DatasetCache(path))
+
+
+@pytest.mark.parametrize("year", ["2020", "2020.0", 2020])
+def test_read_details_matches_float_year(details, year):
+    df = chat._read_details("600000.sh", year)
+    assert len(df) == 1
+    assert df["年份"].iloc[0] == 2020.0
+
+
+def test_read_details_without_year_or_with_bad_year(details):
+    assert len(chat._read_details("600000.SH")) == 2
+    assert chat._read_details("600000.SH", "abc").empty
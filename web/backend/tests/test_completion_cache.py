@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import json
+
+import httpx
+import pytest
+
+from api import completion_cache, deepseek
+from api.completion_cache import CompletionCache, cache_from_env, completion_key
+from api.deepseek import DeepSeekClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # last_used 严格递增，淘汰顺序确定
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(completion_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _payload(*contents, **kwargs):
+    return {
+        "model": "deepseek-chat", "temperature": 0.6, "max_tokens": 2000, "stream": False,
+        "messages": [{"role": "user", "content": c} for c in contents], **kwargs,
+    }
+
+
+def test_key_depends_on_messages_and_sampling_not_stream():
+    assert completion_key(_payload("a", "b")) == completion_key(_payload("a", "b"))
+    assert completion_key(_payload("a", "b")) == completion_key(_payload("a", "b", stream=True))
+    assert completion_key(_payload("a", "b")) != completion_key(_payload("a", "c"))
+    assert completion_key(_payload("a", "b")) != completion_key(_payload("a"))
+    assert completion_key(_payload("a")) != completion_key(_payload("a", temperature=0.0))
+
+
+def test_hit_and_miss(tmp_path, clock):
+    cache = CompletionCache(str(tmp_path / "c.sqlite3"))
+    key, other = completion_key(_payload("a")), completion_key(_payload("b"))
+    assert cache.get(key) is None
+    cache.put(key, ["你", "好"])
+    assert cache.get(key) == ["你", "好"]
+    assert cache.get(other) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+    # 重启后从文件恢复
+    assert CompletionCache(cache.path).get(key) == ["你", "好"]
+
+
+def test_lru_eviction_to_ninety_percent(tmp_path, clock):
+    chunk = "x" * 96  # 每条约 100 字节
+    size = len(json.dumps([chunk]))
+    cache = CompletionCache(str(tmp_path / "c.sqlite3"), max_bytes=10 * size)
+    for i in range(10):
+        cache.put(f"k{i}", [chunk])
+    assert cache.stats()["evictions"] == 0
+    cache.get("k0")  # k0 最近使用过，不应先被淘汰
+    cache.put("k10", [chunk])
+    stats = cache.stats()
+    assert stats["bytes"] <= 0.9 * cache.max_bytes
+    assert stats["evictions"] == 2
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert cache.get("k0") == [chunk] and cache.get("k10") == [chunk]
+    # 超过上限的单条回复不缓存
+    cache.put("big", ["y" * cache.max_bytes])
+    assert cache.get("big") is None
+
+
+def test_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.delenv("DEEPSEEK_CACHE", raising=False)
+    assert cache_from_env() is None
+    monkeypatch.setenv("DEEPSEEK_CACHE", "1")
+    monkeypatch.setenv("DEEPSEEK_CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    monkeypatch.setenv("DEEPSEEK_CACHE_MAX_MB", "0.5")
+    assert cache_from_env().max_bytes == 512 * 1024
+
+
+def _sse(*contents, done=True):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': c}}]})}\n\n" for c in contents]
+    return "".join(lines + (["data: [DONE]\n\n"] if done else [])).encode("utf-8")
+
+
+@pytest.mark.parametrize("done", [True, False])
+def test_only_completed_streams_are_stored(tmp_path, monkeypatch, done):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=_sse("a", "b", done=done))
+
+    monkeypatch.setattr(deepseek, "_ASYNC_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    cache = CompletionCache(str(tmp_path / "c.sqlite3"))
+    client = DeepSeekClient(api_key="test", base_url="http://mock/v1", cache=cache)
+
+    async def ask():
+        return [c async for c in client.astream_chat("hi")]
+
+    assert asyncio.run(ask()) == ["a", "b"]
+    assert asyncio.run(ask()) == ["a", "b"]
+    # 收到 [DONE] 的回复第二次直接回放；未结束的流不缓存，第二次仍请求上游
+    assert len(calls) == (1 if done else 2)
+    assert cache.stats()["entries"] == (1 if done else 0)
@@ -0,0 +1,76 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from api.compression import CompressionMiddleware, choose_encoding, zstandard
+from api.conditional import is_fresh, make_etag, not_modified
+
+BODIES = {"small": "x" * 10, "large": "x" * 4096}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/{name}")
+    def body(name: str, request: Request):
+        etag = make_etag(name)
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        return PlainTextResponse(BODIES[name], headers={"ETag": etag})
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=1, zstd;q=0.5", "gzip"),
+        ("zstd", "zstd" if zstandard is not None else None),
+        ("gzip;q=0", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_large_response_gets_suffixed_etag(client):
+    r = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"] == make_etag("large")[:-1] + '-gzip"'
+    assert r.text == BODIES["large"]
+    assert "Accept-Encoding" in r.headers["vary"]
+
+
+@pytest.mark.parametrize("name", ["small", "large"])
+def test_not_modified_echoes_cached_etag(client, name):
+    headers = {"Accept-Encoding": "gzip"}
+    cached = client.get(f"/{name}", headers=headers).headers["etag"]
+    r = client.get(f"/{name}", headers={**headers, "If-None-Match": cached})
+    assert r.status_code == 304
+    assert r.headers["etag"] == cached
+
+
+def test_not_modified_without_suffix_for_small_body(client):
+    r = client.get("/small", headers={"Accept-Encoding": "gzip", "If-None-Match": make_etag("small")})
+    assert r.status_code == 304
+    assert r.headers["etag"] == make_etag("small")
+
+
+def test_streaming_body_is_valid_gzip():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["a" * 100, "b" * 100]), media_type="text/plain")
+
+    r = TestClient(app).get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert r.text == "a" * 100 + "b" * 100
@@ -0,0 +1,55 @@
+import pytest
+from starlette.requests import Request
+
+from api.conditional import CACHE_CONTROL, is_fresh, make_etag, matching_tag, not_modified, request_etag
+
+
+def _request(path="/api/x", query="", if_none_match=None):
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": headers})
+
+
+def test_make_etag_is_strong_and_deterministic():
+    tag = make_etag("v1", "/api/x", None)
+    assert tag.startswith('"') and tag.endswith('"') and len(tag) == 26
+    assert tag == make_etag("v1", "/api/x", "")
+    assert tag != make_etag("v2", "/api/x", None)
+
+
+def test_request_etag_covers_path_query_and_parts():
+    base = request_etag(_request(query="a=1"), "v1", "json")
+    assert base != request_etag(_request(query="a=2"), "v1", "json")
+    assert base != request_etag(_request(path="/api/y", query="a=1"), "v1", "json")
+    assert base != request_etag(_request(query="a=1"), "v1", "arrow")
+
+
+@pytest.mark.parametrize(
+    "header, fresh",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"abc-gzip"', True),
+        ('"abc-zstd"', True),
+        ('"other", "abc"', True),
+        ("*", True),
+        ('"abc-br"', False),
+        ('"abcd"', False),
+    ],
+)
+def test_is_fresh(header, fresh):
+    assert is_fresh(_request(if_none_match=header), '"abc"') is fresh
+
+
+def test_matching_tag_returns_client_form():
+    assert matching_tag('"x", W/"abc-gzip"', '"abc"') == 'W/"abc-gzip"'
+    assert matching_tag('"x"', '"abc"') is None
+    assert matching_tag(None, '"abc"') is None
+
+
+def test_not_modified():
+    r = not_modified('"abc"')
+    assert r.status_code == 304
+    assert r.headers["etag"] == '"abc"'
+    assert r.headers["cache-control"] == CACHE_CONTROL
+    assert "cache-control" not in not_modified('"abc"', cache_control=None).headers
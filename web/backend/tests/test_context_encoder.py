@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from api import chat
+from api.catalog import Catalog
+from api.context_encoder import (
+    MIN_ROWS, _fit_rows, _num, encode_stock_context, encode_strategy_context, estimate_tokens, kline_stats,
+)
+from api.db import POOL
+
+
+def test_estimate_tokens_and_num():
+    assert estimate_tokens("你好") == 2
+    assert estimate_tokens("abcdefg") == 2
+    assert _num(1.5000) == "1.5"
+    assert _num(float("nan")) == "-"
+    assert _num(None) == "-"
+
+
+def test_fit_rows_keeps_newest_within_budget():
+    lines = [f"row{i:03d}" for i in range(100)]
+    kept, used = _fit_rows("header", lines, budget=30)
+    assert kept == lines[-len(kept):]
+    assert used <= 30 or len(kept) == MIN_ROWS
+    assert _fit_rows("header", lines, budget=1)[0] == lines[-MIN_ROWS:]
+    assert _fit_rows("header", lines, budget=10_000, max_rows=7)[0] == lines[-7:]
+
+
+def test_kline_stats():
+    bars = pd.DataFrame({"close": [10.0, 11.0, 9.9, 12.0], "low": [9, 10, 9.5, 11], "high": [11, 12, 10, 13]})
+    s = kline_stats(bars)
+    assert s["chg"] == pytest.approx(20.0)
+    assert s["mdd"] == pytest.approx(10.0)
+    assert (s["support"], s["resistance"]) == (9, 13)
+
+
+def test_encode_stock_context_orders_rows_and_respects_max_rows():
+    bars = pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=30).strftime("%Y-%m-%d")[::-1],
+        "open": np.arange(1.0, 31.0), "high": np.arange(2.0, 32.0), "low": np.arange(0.5, 30.5),
+        "close": np.arange(1.0, 31.0),
+    })
+    text, tokens = encode_stock_context("sh.600000", {"证券名称": "浦发银行"}, bars, max_rows=10)
+    lines = text.splitlines()
+    assert lines[0].startswith("【sh.600000 浦发银行】")
+    assert lines[-1].startswith("240130,")
+    assert len(lines) == 3 + 10
+    assert tokens == estimate_tokens("\n".join(lines[:3])) + sum(estimate_tokens(l) + 1 for l in lines[3:])
+
+
+def test_encode_strategy_context_uses_profile():
+    profile = {"orders": 40, "buy": 25, "sell": 15, "win": 22, "lose": 18,
+               "codes": {"sz.000001": 3, "sh.600000": 10, "sh.600001": 3}}
+    recent = pd.DataFrame({
+        "time": ["2024-01-03", "2024-01-01", "2024-01-02"], "code": ["sh.600000"] * 3,
+        "direction": ["buy", "sell", "buy"], "price": [1.0, 2.0, 3.0], "result": ["win", "lose", "win"],
+    })
+    text, _ = encode_strategy_context("u1", {"returnRate": 12.5, "winRate": 55}, profile, recent, top_codes=2)
+    lines = text.splitlines()
+    assert lines[0] == "【用户 u1】交易40笔 收益率12.5% 胜率55%"
+    assert lines[1] == "买25 卖15 盈22 亏18 标的3只 常用:sh.600000×10 sh.600001×3"
+    assert [l[:10] for l in lines[3:]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+@pytest.fixture
+def order_book(tmp_path, monkeypatch):
+    (tmp_path / "order_book").mkdir()
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        "user": rng.choice(["u1", "U2"], n),
+        "time": pd.date_range("2020-01-01", periods=n).strftime("%Y-%m-%d"),
+        "code": rng.choice(["sh.600000", "sz.000001", "sh.600519"], n),
+        "price": rng.uniform(1, 100, n),
+        "direction": rng.choice(["buy", "sell"], n),
+        "result": rng.choice(["win", "lose"], n),
+    }).sample(frac=1, random_state=1)
+    df.to_parquet(tmp_path / "order_book" / "order_book.parquet", index=False)
+    monkeypatch.setattr(chat, "CATALOG", Catalog(POOL, str(tmp_path)))
+    return df
+
+
+def test_strategy_profile_matches_full_scan(order_book):
+    orders = order_book[order_book["user"].str.lower() == "u2"]
+    profile = chat._strategy_profile("u2")
+    assert profile["orders"] == len(orders)
+    assert (profile["buy"], profile["sell"]) == (
+        (orders["direction"] == "buy").sum(), (orders["direction"] == "sell").sum())
+    assert (profile["win"], profile["lose"]) == (
+        (orders["result"] == "win").sum(), (orders["result"] == "lose").sum())
+    assert profile["codes"] == orders["code"].value_counts().to_dict()
+    assert chat._strategy_profile("nobody")["orders"] == 0
+
+
+def test_recent_orders_limited_in_sql(order_book):
+    recent = chat._read_filter_df("order_book", "u1", "ORDER BY time DESC LIMIT ?", [7])
+    expected = order_book[order_book["user"] == "u1"].sort_values("time").tail(7)
+    assert sorted(recent["time"]) == sorted(expected["time"])
@@ -0,0 +1,79 @@
+import importlib
+import os
+
+import pytest
+
+from api.conversations import CONVERSATION_ID, ConversationStore, _brief
+from api.context_encoder import estimate_tokens
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ConversationStore(str(tmp_path / "chat" / "c.sqlite3"), budget=200, keep_turns=2)
+    yield s
+    s.close()
+
+
+def test_construction_and_stats_do_not_touch_disk(tmp_path):
+    path = tmp_path / "chat" / "c.sqlite3"
+    s = ConversationStore(str(path))
+    assert s.stats()["conversations"] is None
+    assert not path.parent.exists()
+    s.history("conv-0001", "stock", "sh.600000")
+    assert path.exists()
+    s.close()
+
+
+def test_importing_chat_creates_no_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CHAT_STORE_PATH", str(tmp_path / "store" / "c.sqlite3"))
+    import api.chat
+    importlib.reload(api.chat)
+    assert os.listdir(tmp_path) == []
+
+
+def test_history_round_trip(store):
+    assert store.history("conv-0001", "stock", "sh.600000") == []
+    store.append("conv-0001", "问题一", "回答一")
+    assert store.history("conv-0001", "stock", "sh.600000") == [
+        {"role": "user", "content": "问题一"},
+        {"role": "assistant", "content": "回答一"},
+    ]
+
+
+def test_context_change_resets_conversation(store):
+    store.history("conv-0001", "stock", "sh.600000")
+    store.append("conv-0001", "问题", "回答")
+    assert store.history("conv-0001", "stock", "sz.000001") == []
+    assert store.resets == 1
+
+
+def test_compaction_keeps_history_within_budget(store):
+    store.history("conv-0001", "strategy", "trader01")
+    for i in range(12):
+        store.append("conv-0001", f"第{i}个问题。" + "细节" * 20, f"第{i}个回答。" + "分析" * 40)
+    messages = store.history("conv-0001", "strategy", "trader01")
+    assert messages[0]["role"] == "system"
+    assert "【此前对话摘要】" in messages[0]["content"]
+    # 最近的原文轮次保留
+    assert messages[-1]["content"].startswith("第11个回答")
+    assert sum(estimate_tokens(m["content"]) for m in messages[1:]) <= store.budget
+    assert store.compactions > 0
+
+
+def test_prune_drops_stale_conversations(tmp_path):
+    s = ConversationStore(str(tmp_path / "c.sqlite3"), ttl_days=0)
+    s.history("conv-0001", "stock", "sh.600000")
+    s.append("conv-0001", "问", "答")
+    s.prune()
+    assert s.stats()["conversations"] == 0
+    s.close()
+
+
+def test_brief_and_id_pattern():
+    assert _brief("**你好**  世界", 10) == "你好 世界"
+    assert _brief("第一句话。第二句话很长很长很长", 8) == "第一句话。"
+    assert _brief("没有句号的一段很长很长的话", 6) == "没有句号的一…"
+    assert CONVERSATION_ID.match("abcd-1234_x")
+    assert not CONVERSATION_ID.match("short")
+    assert not CONVERSATION_ID.match("bad id with spaces")
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from api import dataset
+from api.dataset import DatasetCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = str(tmp_path / "details.parquet")
+    pd.DataFrame({"a": [1, 2, 3]}).to_parquet(p)
+    return p
+
+
+def test_hits_until_file_changes(path):
+    cache = DatasetCache(path)
+    assert cache.version == "unloaded"
+    first = cache.get()
+    assert cache.get() is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    stats = cache.stats()
+    assert stats["rows"] == 3 and stats["hit_rate"] == 0.5
+
+    pd.DataFrame({"a": [1, 2, 3, 4]}).to_parquet(path)  # 大小变化
+    second = cache.get()
+    assert second is not first and second.num_rows == 4
+    assert first.num_rows == 3  # 旧快照不受影响
+    assert cache.misses == 2
+
+
+def test_reload_on_mtime_change_with_same_size(path):
+    cache = DatasetCache(path)
+    first = cache.get()
+    version = cache.version
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert cache.get() is not first
+    assert cache.version != version and cache.misses == 2
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DatasetCache(str(tmp_path / "nope.parquet")).get()
+
+
+def test_concurrent_readers_load_once(path, monkeypatch):
+    loads = []
+    read_table = dataset.pq.read_table
+
+    def slow_read(p):
+        loads.append(p)
+        time.sleep(0.05)
+        return read_table(p)
+
+    monkeypatch.setattr(dataset.pq, "read_table", slow_read)
+    cache = DatasetCache(path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+    assert all(r is results[0] for r in results)
+    assert (cache.hits, cache.misses) == (7, 1)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from api import deepseek
+from api.deepseek import DeepSeekClient
+
+
+class _Body(httpx.AsyncByteStream):
+    """上游 SSE 响应体，记录是否被关闭。"""
+
+    def __init__(self, lines, hold=False):
+        self.lines = lines
+        self.hold = hold  # 发完后不结束，模拟仍在生成的长回复
+        self.closed = False
+
+    async def __aiter__(self):
+        for line in self.lines:
+            yield line.encode("utf-8")
+        if self.hold:
+            await asyncio.sleep(60)
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _sse(*contents, done=True):
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': c}}]}, ensure_ascii=False)}\n\n" for c in contents]
+    lines.insert(1, ": keep-alive\n\n")
+    if done:
+        lines.append("data: [DONE]\n\n")
+    return lines
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def use(body, status=200):
+        def handler(request):
+            calls.append(json.loads(request.content))
+            return httpx.Response(status, stream=body, headers={"Content-Type": "text/event-stream"})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(deepseek, "_ASYNC_CLIENT", client)
+        return calls
+
+    return use
+
+
+def _client():
+    return DeepSeekClient(api_key="test", base_url="http://mock/v1")
+
+
+def test_astream_chat_yields_deltas(upstream):
+    calls = upstream(_Body(_sse("你好", "，", "世界")))
+
+    async def main():
+        return [c async for c in _client().astream_chat("hi", [{"role": "user", "content": "before"}])]
+
+    assert asyncio.run(main()) == ["你好", "，", "世界"]
+    (payload,) = calls
+    assert payload["stream"] is True
+    assert [m["role"] for m in payload["messages"]] == ["system", "user", "user"]
+
+
+def test_astream_chat_disconnect_closes_upstream(upstream):
+    body = _Body(_sse("a", "b", done=False), hold=True)
+    upstream(body)
+
+    async def main():
+        stream = _client().astream_chat("hi")
+        assert await stream.__anext__() == "a"
+        await stream.aclose()  # 调用方断开
+
+    asyncio.run(main())
+    assert body.closed
+
+
+def test_astream_chat_http_error_is_reported_in_stream(upstream):
+    upstream(_Body([]), status=503)
+
+    async def main():
+        return [c async for c in _client().astream_chat("hi")]
+
+    (message,) = asyncio.run(main())
+    assert message.startswith("【请求错误】") and "503" in message
+
+
+def test_sync_chat_uses_configured_timeouts(monkeypatch):
+    seen = {}
+
+    class _Resp:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+    def post(url, **kwargs):
+        seen.update(kwargs)
+        return _Resp()
+
+    monkeypatch.setattr(deepseek._SESSION, "post", post)
+    assert _client().chat("hi") == "ok"
+    assert seen["timeout"] == (deepseek.CONNECT_TIMEOUT, deepseek.READ_TIMEOUT)
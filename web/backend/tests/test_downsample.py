@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.downsample import downsample_ohlc
+
+
+def _bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=n).strftime("%Y-%m-%d"),
+        "open": close + rng.normal(0, 0.1, n),
+        "close": close,
+        "high": close + rng.uniform(0, 1, n),
+        "low": close - rng.uniform(0, 1, n),
+        "volume": rng.integers(100, 1000, n),
+    })
+
+
+@pytest.mark.parametrize("max_points", [None, 0, 100, 500])
+def test_no_op_when_within_budget(max_points):
+    bars = _bars(100)
+    assert downsample_ohlc(bars, max_points) is bars
+
+
+@pytest.mark.parametrize("n, max_points", [(1000, 100), (1001, 7), (101, 100), (10, 1)])
+def test_buckets_preserve_ohlc(n, max_points):
+    bars = _bars(n)
+    out = downsample_ohlc(bars, max_points)
+    assert len(out) == max_points
+    assert list(out.columns) == list(bars.columns)
+    # 极值、成交量总量与首尾价格不丢失
+    assert out["high"].max() == bars["high"].max()
+    assert out["low"].min() == bars["low"].min()
+    assert out["volume"].sum() == bars["volume"].sum()
+    assert out["open"].iloc[0] == bars["open"].iloc[0]
+    assert out["close"].iloc[-1] == bars["close"].iloc[-1]
+    assert out["date"].iloc[-1] == bars["date"].iloc[-1]
+    assert out["date"].is_monotonic_increasing
+
+
+def test_bucket_values_match_groupby():
+    bars = _bars(250)
+    out = downsample_ohlc(bars, 10)
+    bucket = np.repeat(np.arange(10), 25)
+    g = bars.groupby(bucket)
+    expected = pd.DataFrame({
+        "date": g["date"].last(), "open": g["open"].first(), "close": g["close"].last(),
+        "high": g["high"].max(), "low": g["low"].min(), "volume": g["volume"].sum(),
+    }).reset_index(drop=True)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+
+
+def test_missing_columns_are_skipped():
+    bars = _bars(50)[["date", "close"]]
+    out = downsample_ohlc(bars, 5)
+    assert list(out.columns) == ["date", "close"]
+    assert out["close"].tolist() == bars["close"].iloc[9::10].tolist()
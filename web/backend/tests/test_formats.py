@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from starlette.requests import Request
+
+from api.formats import _ndjson_lines, encode, negotiate, to_columns
+
+
+def _request(accept: str = "") -> Request:
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+@pytest.fixture
+def orders():
+    return pd.DataFrame({
+        "time": pd.to_datetime(["2024-01-02 09:30:00", None, "2024-01-03 14:59:59.5"], format="ISO8601"),
+        "price": [10.5, np.nan, np.inf],
+        "qty": [100, 200, 300],
+        "code": ["600000.SH", None, "000001.SZ"],
+        "day": [pd.Timestamp("2024-01-02").date(), None, pd.NaT],
+    })
+
+
+def test_records_serializes_datetimes_and_missing_values(orders):
+    body = json.loads(encode(orders, "records").body)
+    assert body[0] == {
+        "time": "2024-01-02T09:30:00.000000", "price": 10.5, "qty": 100, "code": "600000.SH", "day": "2024-01-02",
+    }
+    assert body[1] == {"time": None, "price": None, "qty": 200, "code": None, "day": None}
+    assert body[2]["time"] == "2024-01-03T14:59:59.500000"
+    assert body[2]["price"] is None
+
+
+def test_columnar_matches_records(orders):
+    columns = json.loads(encode(orders, "columnar").body)
+    records = json.loads(encode(orders, "records").body)
+    assert columns == {k: [r[k] for r in records] for k in orders.columns}
+
+
+def test_datetime_precision_follows_column():
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-01-02 00:00", "2024-01-03 15:00"])})
+    assert to_columns(df) == {"date": ["2024-01-02T00:00:00", "2024-01-03T15:00:00"]}
+
+
+def test_tz_aware_datetimes():
+    df = pd.DataFrame({"t": pd.to_datetime(["2024-01-02 09:30"]).tz_localize("Asia/Shanghai")})
+    assert to_columns(df) == {"t": ["2024-01-02T09:30:00+08:00"]}
+
+
+def test_empty_frame():
+    assert json.loads(encode(pd.DataFrame({"a": []}), "records").body) == []
+
+
+def test_negotiate():
+    assert negotiate(_request(), None) == "records"
+    assert negotiate(_request("application/vnd.apache.arrow.stream"), None) == "arrow"
+    assert negotiate(_request("application/vnd.apache.arrow.stream"), "COLUMNAR") == "columnar"
+    # ndjson 只在显式允许时通过 Accept 协商
+    assert negotiate(_request("application/x-ndjson"), None) == "records"
+    assert negotiate(_request("application/x-ndjson"), None, allowed=("records", "ndjson")) == "ndjson"
+    with pytest.raises(ValueError):
+        negotiate(_request(), "xml")
+
+
+def test_ndjson_matches_records(orders):
+    batches = pa.Table.from_pandas(orders, preserve_index=False).to_batches()
+    lines = b"".join(_ndjson_lines(batches)).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(encode(orders, "records").body)
+    assert "NaN" not in lines[1] and "Infinity" not in lines[2]
+
+
+def test_ndjson_batches_use_iso_times():
+    df = pd.DataFrame({"time": pd.to_datetime(["2021-01-01 00:00", "2021-01-02 15:00"]), "x": [np.nan, 1.0]})
+    batches = pa.Table.from_pandas(df, preserve_index=False).to_batches(max_chunksize=1)
+    rows = [json.loads(line) for line in b"".join(_ndjson_lines(batches)).splitlines()]
+    assert rows == [{"time": "2021-01-01T00:00:00", "x": None}, {"time": "2021-01-02T15:00:00", "x": 1.0}]
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import kline
+from api.catalog import Catalog
+from api.db import POOL
+from api.kline import _bars_sql, _slice_bars, normalize_code
+from api.kline_store import KlineStore
+
+BARS = pd.DataFrame({"date": [f"2024-01-{d:02d}" for d in range(1, 11)], "close": range(10)})
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [("SH600000", "sh.600000"), ("sz-000001", "sz.000001"), ("600000.SH", "sh.600000"), ("000001sz", "sz.000001")],
+)
+def test_normalize_code(code, expected):
+    assert normalize_code(code) == expected
+
+
+@pytest.mark.parametrize(
+    "start, end, since, limit, dates",
+    [
+        (None, None, None, None, BARS["date"].tolist()),
+        ("2024-01-03", "2024-01-05", None, None, ["2024-01-03", "2024-01-04", "2024-01-05"]),
+        (None, None, "2024-01-08", None, ["2024-01-09", "2024-01-10"]),
+        (None, None, None, 2, ["2024-01-09", "2024-01-10"]),
+        ("2024-01-02", "2024-01-06", None, 2, ["2024-01-05", "2024-01-06"]),
+    ],
+)
+def test_slice_bars(start, end, since, limit, dates):
+    assert _slice_bars(BARS, start, end, since, limit)["date"].tolist() == dates
+
+
+def _daily(code="sh.600000", start="2023-11-01", end="2024-03-31", seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end)
+    # 随机停牌日 + 整周缺失（春节）
+    dates = dates[(rng.random(len(dates)) > 0.2) & ~((dates >= "2024-02-09") & (dates <= "2024-02-18"))]
+    n = len(dates)
+    return pd.DataFrame({
+        "code": code, "date": dates.strftime("%Y-%m-%d"),
+        "open": rng.uniform(9, 11, n), "close": rng.uniform(9, 11, n),
+        "high": rng.uniform(11, 12, n), "low": rng.uniform(8, 9, n), "volume": rng.integers(100, 10_000, n),
+    })
+
+
+def _resample(daily, rule):
+    df = daily.assign(d=pd.to_datetime(daily["date"])).set_index("d")
+    out = df.resample(rule).agg({
+        "date": "last", "open": "first", "close": "last", "high": "max", "low": "min", "volume": "sum",
+    })
+    return out[out["date"].notna()].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("period, rule", [("W", "W-SUN"), ("M", "ME"), ("Q", "QE"), ("Y", "YE")])
+def test_period_bars_match_pandas_resample(period, rule):
+    daily = _daily()
+    with POOL.cursor() as cur:
+        got = cur.from_df(daily).query("bars", _bars_sql("bars", period)).fetchdf()
+    expected = _resample(daily, rule)
+    assert got["code"].eq("sh.600000").all()
+    pd.testing.assert_frame_equal(got.drop(columns="code"), expected, check_dtype=False)
+
+
+def test_daily_bars_pass_through():
+    daily = _daily()
+    with POOL.cursor() as cur:
+        got = cur.from_df(daily).query("bars", _bars_sql("bars", "D")).fetchdf()
+    pd.testing.assert_frame_equal(got, daily, check_dtype=False)
+
+
+@pytest.fixture
+def kline_client(tmp_path, monkeypatch):
+    path = tmp_path / "day_klines" / "all_klines.parquet"
+    path.parent.mkdir()
+    pd.concat([_daily("sh.600000"), _daily("sz.000001", seed=1)]).to_parquet(path, index=False)
+    monkeypatch.setattr(kline, "CATALOG", Catalog(POOL, str(tmp_path)))
+    monkeypatch.setattr(kline, "KLINE_PATH", str(path))
+    monkeypatch.setattr(kline, "KLINES", KlineStore(str(path)))
+    kline._load_bars.cache_clear()
+    app = FastAPI()
+    app.include_router(kline.router, prefix="/api")
+    yield TestClient(app), path
+    kline._load_bars.cache_clear()
+
+
+def test_bar_cache_follows_file_version(kline_client):
+    client, path = kline_client
+    before = client.get("/api/kline/600000.SH", params={"period": "M"}).json()
+    assert kline._load_bars.cache_info().currsize == 1
+    # 数据更新后版本变化，缓存键随之变化，不会返回旧数据
+    _daily("sh.600000", end="2024-04-30", seed=2).to_parquet(path, index=False)
+    after = client.get("/api/kline/600000.SH", params={"period": "M"}).json()
+    assert after[-1]["date"].startswith("2024-04")
+    assert len(after) == len(before) + 1
+    assert kline._load_bars.cache_info().currsize == 2
+
+
+def test_batch_mixed_code_formats_and_missing(kline_client):
+    client, _ = kline_client
+    r = client.post("/api/kline/batch", json={"codes": ["600000.SH", "sh.600000", "SZ000001", "688001"]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["period"] == "D"
+    assert list(body["data"]) == ["sh.600000", "sz.000001"]
+    assert body["missing"] == ["sh.688001"]
+    bars = body["data"]["sz.000001"]
+    assert bars["date"] == _daily("sz.000001", seed=1)["date"].tolist()
+
+
+def test_batch_matches_single_route(kline_client):
+    client, _ = kline_client
+    params = {"period": "W", "start": "2024-01-10", "end": "2024-03-01"}
+    batch = client.post("/api/kline/batch", json={"codes": ["sh.600000"], **params}).json()
+    single = client.get("/api/kline/sh.600000", params={**params, "format": "columnar"}).json()
+    assert batch["data"]["sh.600000"] == single
+
+
+def test_batch_start_end_select_bars_by_date(kline_client):
+    client, _ = kline_client
+    body = client.post("/api/kline/batch", json={"codes": ["sh.600000"], "period": "M", "start": "2024-01-15"}).json()
+    dates = body["data"]["sh.600000"]["date"]
+    assert dates[0] >= "2024-01-15" and dates[0].startswith("2024-01")
+    # 首根月 K 仍是完整的一月（开盘价取自 start 之前的交易日）
+    daily = _daily()
+    january = daily[daily["date"].str.startswith("2024-01")]
+    assert body["data"]["sh.600000"]["open"][0] == pytest.approx(january["open"].iloc[0])
+    body = client.post("/api/kline/batch", json={"codes": ["sh.600000"], "end": "2023-11-03"}).json()
+    assert body["data"]["sh.600000"]["date"] == [d for d in daily["date"] if d <= "2023-11-03"]
+
+
+@pytest.mark.parametrize("payload", [
+    {"codes": []},
+    {"codes": [f"sh.{600000 + i}" for i in range(kline.MAX_BATCH_CODES + 1)]},
+    {"codes": ["sh.600000"], "period": "X"},
+    {"codes": ["sh.600000"], "max_points": 0},
+])
+def test_batch_rejects_bad_requests(kline_client, payload):
+    client, _ = kline_client
+    r = client.post("/api/kline/batch", json=payload)
+    assert r.status_code == 400
+    assert "error" in r.json()
+
+
+def test_batch_accepts_max_codes(kline_client):
+    client, _ = kline_client
+    codes = [f"sh.{600000 + i}" for i in range(kline.MAX_BATCH_CODES)]
+    body = client.post("/api/kline/batch", json={"codes": codes}).json()
+    assert list(body["data"]) == ["sh.600000"]
+    assert len(body["missing"]) == kline.MAX_BATCH_CODES - 1
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from api.kline_store import KlineStore, index_path_for
+
+# 聚簇脚本在仓库根目录的 scripts/ 下
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "scripts"))
+from cluster_klines import cluster_klines  # noqa: E402
+
+CODES = ["sh.600000", "sz.000001", "sh.600519"]
+
+
+@pytest.fixture
+def clustered(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = []
+    for n, code in zip((7, 3, 12), CODES):
+        frames.append(pd.DataFrame({
+            "code": code,
+            "date": pd.date_range("2024-01-01", periods=n, freq="B").strftime("%Y-%m-%d"),
+            "open": rng.uniform(1, 10, n), "close": rng.uniform(1, 10, n),
+            "high": rng.uniform(10, 11, n), "low": rng.uniform(0, 1, n), "volume": rng.integers(1, 1000, n),
+        }))
+    # 源文件按日期交错，聚簇后才按 code 连续
+    src = tmp_path / "src.parquet"
+    pd.concat(frames).sort_values(["date", "code"]).to_parquet(src, index=False)
+    dst = str(tmp_path / "all_klines.parquet")
+    cluster_klines(str(src), dst, row_group_rows=4)
+    return dst
+
+
+def _scan(path, codes):
+    return duckdb.execute(
+        "SELECT * FROM read_parquet(?) WHERE code IN (SELECT unnest(?)) ORDER BY code, date", [path, codes]
+    ).fetchdf()
+
+
+def test_index_matches_row_groups(clustered):
+    with open(index_path_for(clustered), encoding="utf-8") as f:
+        index = json.load(f)
+    metadata = pq.read_metadata(clustered)
+    assert index["file_size"] == os.path.getsize(clustered)
+    assert index["rows"] == metadata.num_rows == 22
+    for code, (start, stop) in index["codes"].items():
+        for i in range(start, stop):
+            stats = metadata.row_group(i).column(0).statistics
+            assert stats.min == stats.max == code
+    assert sorted(stop for _, stop in index["codes"].values())[-1] == metadata.num_row_groups
+
+
+@pytest.mark.parametrize("codes", [["sh.600000"], ["sz.000001"], ["sh.600519", "sh.600000"]])
+def test_lookup_matches_full_scan(clustered, codes):
+    bars = KlineStore(clustered).lookup(codes)
+    assert bars is not None
+    got = bars.to_pandas().sort_values(["code", "date"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, _scan(clustered, codes), check_dtype=False)
+
+
+def test_missing_code_falls_back(clustered):
+    store = KlineStore(clustered)
+    assert store.lookup(["sh.688001"]) is None
+    assert store.lookup(["sh.600000", "sh.688001"]) is None
+
+
+def test_changed_file_falls_back(clustered):
+    store = KlineStore(clustered)
+    assert store.lookup(["sh.600000"]) is not None
+    # 文件被重写（大小变化）而索引未更新
+    df = pq.read_table(clustered).to_pandas()
+    df.iloc[:-1].to_parquet(clustered, index=False)
+    assert store.lookup(["sh.600000"]) is None
+
+
+def test_index_not_matching_footer_falls_back(clustered):
+    # 大小一致但 row group 区间与实际内容不符
+    index_path = index_path_for(clustered)
+    with open(index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    a, b = index["codes"]["sh.600000"], index["codes"]["sh.600519"]
+    index["codes"]["sh.600000"], index["codes"]["sh.600519"] = b, a
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    assert KlineStore(clustered).lookup(["sh.600000"]) is None
+
+
+def test_missing_index_falls_back(clustered):
+    os.remove(index_path_for(clustered))
+    assert KlineStore(clustered).lookup(["sh.600000"]) is None
@@ -0,0 +1,61 @@
+from api import lru
+from api.lru import VersionedLRU
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_version_change():
+    cache = VersionedLRU(maxsize=4, ttl=60)
+    assert cache.get("k", "v1") is None
+    cache.put("k", "v1", "a")
+    assert cache.get("k", "v1") == "a"
+    assert cache.get("k", "v2") is None
+    # 版本不符的条目被删除，旧版本也不再命中
+    assert cache.get("k", "v1") is None
+    s = cache.stats()
+    assert (s["hits"], s["misses"], s["stale"], s["size"]) == (1, 3, 1, 0)
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(lru.time, "monotonic", clock)
+    cache = VersionedLRU(ttl=10)
+    cache.put("k", "v", "a")
+    clock.now += 9.9
+    assert cache.get("k", "v") == "a"
+    clock.now += 0.2
+    assert cache.get("k", "v") is None
+    assert cache.stale == 1
+
+
+def test_lru_eviction_order():
+    cache = VersionedLRU(maxsize=2, ttl=60)
+    cache.put("a", "v", 1)
+    cache.put("b", "v", 2)
+    cache.get("a", "v")  # a 变为最近使用
+    cache.put("c", "v", 3)
+    assert cache.get("b", "v") is None
+    assert cache.get("a", "v") == 1
+    assert cache.get("c", "v") == 3
+    assert cache.evictions == 1
+
+
+def test_get_or_build_skips_empty_results():
+    cache = VersionedLRU()
+    calls = []
+
+    def build(x):
+        calls.append(x)
+        return "" if x == "bad" else x.upper()
+
+    assert cache.get_or_build("k", "v", build, "ok") == "OK"
+    assert cache.get_or_build("k", "v", build, "ok") == "OK"
+    assert cache.get_or_build("e", "v", build, "bad") == ""
+    assert cache.get_or_build("e", "v", build, "bad") == ""
+    assert calls == ["ok", "bad", "bad"]
@@ -0,0 +1,107 @@
+import json
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import users
+
+ORDERS = pd.DataFrame({
+    "user": ["u1", "u2", "u1", "u1", "u2"],
+    "code": ["sh.600000", "sz.000001", "sh.600000", "sz.000001", "sh.600000"],
+    "time": pd.to_datetime(["2024-01-03", "2024-01-01", "2024-01-02", "2024-01-02", "2024-01-05"]),
+    "result": ["win", "loss", "win", "loss", "win"],
+})
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / "order_book.parquet")
+    ORDERS.to_parquet(path)
+    monkeypatch.setattr(users, "ORDER_BOOK_PATH", path)
+    monkeypatch.setattr(users, "DEFAULT_PAGE_SIZE", 2)
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api")
+    return TestClient(app)
+
+
+def _walk(client, **params):
+    rows, cursor, pages = [], None, 0
+    while True:
+        r = client.get("/api/order_book", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        rows += r.json()
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows, pages
+
+
+def test_default_request_is_paged(client):
+    r = client.get("/api/order_book")
+    assert len(r.json()) == 2
+    assert "X-Next-Cursor" in r.headers
+
+
+def test_cursor_walk_returns_every_row_once_in_time_order(client):
+    rows, pages = _walk(client)
+    assert pages == 3
+    assert [row["time"][:10] for row in rows] == [
+        "2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03", "2024-01-05",
+    ]
+    # 同一时间戳按文件行号排序
+    assert [row["code"] for row in rows[1:3]] == ["sh.600000", "sz.000001"]
+
+
+def test_cursor_walk_desc_with_filter(client):
+    rows, _ = _walk(client, user="u1", order="desc")
+    assert [row["time"][:10] for row in rows] == ["2024-01-03", "2024-01-02", "2024-01-02"]
+    assert [row["code"] for row in rows[1:]] == ["sz.000001", "sh.600000"]
+
+
+def test_last_page_has_no_cursor(client):
+    r = client.get("/api/order_book", params={"limit": 10})
+    assert len(r.json()) == 5
+    assert "X-Next-Cursor" not in r.headers
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"cursor": "not-a-cursor"}, {"order": "up"}])
+def test_invalid_paging_params(client, params):
+    assert client.get("/api/order_book", params=params).status_code == 400
+
+
+def test_ndjson_streams_all_rows_in_file_order(client):
+    r = client.get("/api/order_book", params={"format": "ndjson"})
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["time"][:10] for row in rows] == [t.strftime("%Y-%m-%d") for t in ORDERS["time"]]
+    assert "file_row_number" not in rows[0]
+
+
+@pytest.fixture
+def client_with_nulls(tmp_path, monkeypatch):
+    # 目录名带单引号，且部分行 time 为空
+    path = str(tmp_path / "it's" / "order_book.parquet")
+    (tmp_path / "it's").mkdir()
+    df = ORDERS.copy()
+    df.loc[[1, 3], "time"] = pd.NaT
+    df.to_parquet(path)
+    monkeypatch.setattr(users, "ORDER_BOOK_PATH", path)
+    monkeypatch.setattr(users, "DEFAULT_PAGE_SIZE", 2)
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("order, times", [
+    ("asc", ["2024-01-02", "2024-01-03", "2024-01-05", None, None]),
+    ("desc", ["2024-01-05", "2024-01-03", "2024-01-02", None, None]),
+])
+def test_cursor_walk_keeps_null_times_last(client_with_nulls, order, times):
+    rows, pages = _walk(client_with_nulls, order=order)
+    assert pages == 3
+    assert [row["time"] and row["time"][:10] for row in rows] == times
+    # 空时间的行按文件行号排序
+    null_users = [row["user"] for row in rows if row["time"] is None]
+    assert null_users == (["u2", "u1"] if order == "asc" else ["u1", "u2"])
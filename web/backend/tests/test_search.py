@@ -0,0 +1,61 @@
+import pytest
+
+from api import search
+from api.search import KIND_CODE, KIND_NAME, KIND_PINYIN, SymbolIndex, _code_keys
+
+
+def _index(entries, pairs):
+    pairs = sorted(pairs)
+    index = SymbolIndex()
+    index._current = lambda: ("v", [p[0] for p in pairs], [(p[1], p[2]) for p in pairs], entries)
+    return index
+
+
+def test_code_keys():
+    assert _code_keys("600000.SH") == (
+        "sh.600000", ["600000", "600000.sh", "600000sh", "sh.600000", "sh600000"]
+    )
+    assert _code_keys("ABC") == ("ABC", ["abc"])
+
+
+def test_shortest_match_outside_scan_window_is_found():
+    # 大量以 "pa" 开头的长键排在唯一的短键 "pb" 之前
+    entries = [{"code": f"{i:06d}.SZ", "kline_code": f"sz.{i:06d}", "name": ""} for i in range(600)]
+    pairs = [("pa" + "x" * 5 + f"{i:03d}", KIND_PINYIN, i) for i in range(599)]
+    pairs.append(("pb", KIND_PINYIN, 599))
+    result = _index(entries, pairs).search("p", limit=1)
+    assert [r["code"] for r in result] == ["000599.SZ"]
+    assert result[0]["match"] == "prefix"
+
+
+def test_ranking_exact_then_kind_then_length():
+    entries = [
+        {"code": "600000.SH", "kline_code": "sh.600000", "name": "浦发银行"},
+        {"code": "600001.SH", "kline_code": "sh.600001", "name": "甲"},
+        {"code": "600002.SH", "kline_code": "sh.600002", "name": "乙"},
+    ]
+    pairs = [
+        ("pfyh", KIND_PINYIN, 0),
+        ("pfyhzz", KIND_NAME, 1),
+        ("pf", KIND_PINYIN, 2),
+    ]
+    result = _index(entries, pairs).search(" PF ", limit=3)
+    assert [r["code"] for r in result] == ["600002.SH", "600001.SH", "600000.SH"]
+    assert [r["match"] for r in result] == ["exact", "prefix", "prefix"]
+
+
+def test_best_key_per_entry_and_no_spill_past_prefix():
+    entries = [{"code": "600000.SH", "kline_code": "sh.600000", "name": ""},
+               {"code": "600100.SH", "kline_code": "sh.600100", "name": ""}]
+    pairs = [(k, KIND_CODE, 0) for k in _code_keys("600000.SH")[1]]
+    pairs += [(k, KIND_CODE, 1) for k in _code_keys("600100.SH")[1]]
+    index = _index(entries, pairs)
+    assert [r["code"] for r in index.search("600000")] == ["600000.SH"]
+    assert index.search("600000")[0]["match"] == "exact"
+    assert [r["code"] for r in index.search("sh6001")] == ["600100.SH"]
+    assert index.search("  ") == []
+
+
+@pytest.mark.skipif(search.lazy_pinyin is None, reason="pypinyin 未安装")
+def test_pinyin_initials():
+    assert search._pinyin_initials("浦发银行") == "pfyh"
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from api.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    gate = threading.Event()
+    runs = []
+
+    def work(x):
+        runs.append(x)
+        gate.wait(5)
+        return {"value": x}
+
+    async def main():
+        tasks = [asyncio.ensure_future(flights.do(("k", 1), work, 1)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert runs == [1]
+    assert all(r is results[0] for r in results)
+    assert flights.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_finished_key_runs_again_and_keys_are_separate():
+    flights = SingleFlight()
+
+    async def main():
+        a = await flights.do("a", lambda: 1)
+        b = await flights.do("a", lambda: 2)
+        c = await flights.do("c", lambda: 3)
+        return a, b, c
+
+    assert asyncio.run(main()) == (1, 2, 3)
+    assert flights.executions == 3
+
+
+def test_error_propagates_to_all_waiters():
+    flights = SingleFlight()
+    gate = threading.Event()
+
+    def boom():
+        gate.wait(5)
+        raise ValueError("bad")
+
+    async def main():
+        tasks = [asyncio.ensure_future(flights.do("k", boom)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flights = SingleFlight()
+    gate = threading.Event()
+
+    def work():
+        gate.wait(5)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        gate.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from api.sse import HEARTBEAT, StreamStats, coalesce, sse_frame
+
+
+def _content(frame):
+    assert frame.startswith("data: ") and frame.endswith("\n\n")
+    return json.loads(frame[6:])["content"]
+
+
+async def _collect(deltas, **kwargs):
+    return [f async for f in coalesce(deltas, **kwargs)]
+
+
+def test_sse_frame_keeps_newlines_and_unicode():
+    frame = sse_frame("第一行\n第二行")
+    assert "\n\n" not in frame[:-2]
+    assert _content(frame) == "第一行\n第二行"
+
+
+def test_first_delta_immediate_rest_coalesced():
+    async def deltas():
+        for d in ["a", "b", "", "c"]:
+            yield d
+
+    stats = StreamStats()
+    frames = asyncio.run(_collect(deltas(), flush_ms=50, flush_bytes=1024, heartbeat=10, stats=stats))
+    assert [_content(f) for f in frames] == ["a", "bc"]
+    s = stats.stats()
+    assert (s["streams"], s["active"], s["deltas"], s["frames"]) == (1, 0, 3, 2)
+
+
+def test_flush_bytes_threshold():
+    async def deltas():
+        for _ in range(10):
+            yield "x" * 4
+
+    frames = asyncio.run(_collect(deltas(), flush_ms=10_000, flush_bytes=8, heartbeat=10, stats=None))
+    assert [_content(f) for f in frames] == ["xxxx"] + ["xxxx" * 2] * 4 + ["xxxx"]
+
+
+def test_zero_window_sends_every_delta():
+    async def deltas():
+        for d in "abc":
+            yield d
+
+    frames = asyncio.run(_collect(deltas(), flush_ms=0, heartbeat=10, stats=None))
+    assert [_content(f) for f in frames] == ["a", "b", "c"]
+
+
+def test_heartbeat_while_upstream_idle():
+    async def deltas():
+        yield "a"
+        await asyncio.sleep(0.25)
+        yield "b"
+
+    stats = StreamStats()
+    frames = asyncio.run(_collect(deltas(), flush_ms=10, heartbeat=0.05, stats=stats))
+    assert frames[0] == sse_frame("a") and frames[-1] == sse_frame("b")
+    assert HEARTBEAT in frames
+    assert stats.heartbeats == frames.count(HEARTBEAT)
+
+
+def test_consumer_close_closes_upstream():
+    closed = []
+
+    async def deltas():
+        try:
+            while True:
+                yield "x"
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    async def main():
+        stream = coalesce(deltas(), flush_ms=0, heartbeat=10, stats=None)
+        assert await stream.__anext__() == sse_frame("x")
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert closed == [True]
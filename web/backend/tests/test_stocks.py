@@ -0,0 +1,64 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import stocks
+from api.dataset import DatasetCache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / "details.parquet")
+    pd.DataFrame({
+        "证券代码": ["600000.SH", "600000.SH", "000001.SZ"],
+        "证券名称": ["浦发银行", "浦发银行", "平安银行"],
+        "年份": [2020.0, 2021.0, 2020.0],
+        "年涨跌幅": [1.5, -3.0, 8.0],
+    }).to_parquet(path)
+    monkeypatch.setattr(stocks, "DETAILS_PATH", path)
+    monkeypatch.setattr(stocks, "DETAILS", DatasetCache(path))
+    app = FastAPI()
+    app.include_router(stocks.router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("year", ["2020", "2020.0", " 2020"])
+def test_year_filter_matches_float_column(client, year):
+    r = client.get("/api/stocks", params={"year": year, "sort": "code"})
+    assert r.status_code == 200
+    assert [row["证券代码"] for row in r.json()] == ["000001.SZ", "600000.SH"]
+    assert r.headers["X-Total-Count"] == "2"
+
+
+def test_year_filter_invalid_matches_nothing(client):
+    r = client.get("/api/stocks", params={"year": "abc"})
+    assert r.status_code == 200
+    assert r.json() == []
+
+
+def test_encode_runs_off_event_loop(client, monkeypatch):
+    threads = []
+
+    def encode(df, fmt, headers=None):
+        try:
+            asyncio.get_running_loop()
+            threads.append("loop")
+        except RuntimeError:
+            threads.append("worker")
+        return stocks.JSONResponse([], headers=headers)
+
+    monkeypatch.setattr(stocks, "encode", encode)
+    r = client.get("/api/stocks")
+    assert r.status_code == 200
+    assert threads == ["worker"]
+
+
+def test_code_filter_accepts_several_codes(client):
+    r = client.get("/api/stocks", params=[("code", "000001.SZ"), ("code", "600000.SH"), ("sort", "code")])
+    assert r.status_code == 200
+    assert [row["证券代码"] for row in r.json()] == ["000001.SZ", "600000.SH", "600000.SH"]
+    assert r.headers["X-Total-Count"] == "3"
+    assert len(client.get("/api/stocks", params={"code": "000001.SZ"}).json()) == 1
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.technicals import compute_indicators, parse_indicators
+
+
+@pytest.fixture(scope="module")
+def bars():
+    rng = np.random.default_rng(0)
+    close = 20 + rng.normal(0, 0.5, 120).cumsum()
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=120).strftime("%Y-%m-%d"),
+        "close": close,
+        "high": close + rng.uniform(0, 1, 120),
+        "low": close - rng.uniform(0, 1, 120),
+    })
+
+
+def _ema_loop(x, span):
+    alpha, out = 2 / (span + 1), [x[0]]
+    for v in x[1:]:
+        out.append(alpha * v + (1 - alpha) * out[-1])
+    return np.array(out)
+
+
+def _wilder_loop(x, n):
+    """与 ewm(alpha=1/n, adjust=False, min_periods=n) 相同：从首个有效值开始递推，有效值不足 n 个时为 NaN。"""
+    out, prev, seen = [], None, 0
+    for v in x:
+        if not np.isnan(v):
+            prev = v if prev is None else prev + (v - prev) / n
+            seen += 1
+        out.append(prev if seen >= n else np.nan)
+    return np.array(out, dtype=float)
+
+
+def test_parse_indicators_normalizes():
+    assert parse_indicators(" MA20, ma5 ,expma,ma20,macd,rsi") == (
+        ("ema", 12), ("ma", 5), ("ma", 20), ("macd", 0), ("rsi", 14),
+    )
+    assert parse_indicators("") == ()
+
+
+@pytest.mark.parametrize("text", ["kdj", "ma0", "ma-5", "5ma"])
+def test_parse_indicators_rejects(text):
+    with pytest.raises(ValueError):
+        parse_indicators(text)
+
+
+def test_moving_averages_and_macd(bars):
+    out = compute_indicators(bars, parse_indicators("ma5,ema12,macd,boll20"))
+    close = bars["close"].to_numpy()
+    ma5 = [np.nan] * 4 + [close[i - 4:i + 1].mean() for i in range(4, len(close))]
+    np.testing.assert_allclose(out["ma5"], ma5)
+    np.testing.assert_allclose(out["ema12"], _ema_loop(close, 12))
+    dif = _ema_loop(close, 12) - _ema_loop(close, 26)
+    dea = _ema_loop(dif, 9)
+    np.testing.assert_allclose(out["macd_dif"], dif)
+    np.testing.assert_allclose(out["macd_hist"], 2 * (dif - dea))
+    window = close[-20:]
+    assert out["boll20_mid"].iloc[-1] == pytest.approx(window.mean())
+    assert out["boll20_upper"].iloc[-1] == pytest.approx(window.mean() + 2 * window.std())
+
+
+def test_rsi_and_atr(bars):
+    out = compute_indicators(bars, parse_indicators("rsi14,atr14"))
+    close, high, low = (bars[c].to_numpy() for c in ("close", "high", "low"))
+    delta = np.r_[np.nan, np.diff(close)]
+    gain = _wilder_loop(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 14)
+    loss = _wilder_loop(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 14)
+    np.testing.assert_allclose(out["rsi14"], 100 - 100 / (1 + gain / loss))
+    prev = np.r_[np.nan, close[:-1]]
+    tr = np.nanmax(np.c_[high - low, np.abs(high - prev), np.abs(low - prev)], axis=1)
+    np.testing.assert_allclose(out["atr14"], _wilder_loop(tr, 14))
+
+
+def test_rsi_without_losses_is_100_not_inf():
+    bars = pd.DataFrame({"date": range(30), "close": np.arange(30.0)})
+    out = compute_indicators(bars, parse_indicators("rsi6"))
+    assert out["rsi6"].iloc[-1] == 100
+    assert not np.isinf(out["rsi6"]).any()
@@ -29,47 +29,43 @@ const apiRequest = async (url, options = {}) => {
   }
 };
 
+// 后端 /stocks 返回的中文字段 -> 前端结构
+const mapStockItem = (item) => ({
+  code: item["证券代码"],
+  name: item["证券名称"],
+  year: Number(item["年份"]),
+  annual_return: parseFloat(item["年涨跌幅"]),
+  max_drawdown: parseFloat(item["最大回撤"]),
+  pe_ratio: parseFloat(item["市盈率"]),
+  pb_ratio: parseFloat(item["市净率"]),
+  sharpe_ratio: parseFloat(item["夏普比率-普通收益率-日-一年定存利率"])
+});
+
+// 过滤条件 + 分页参数 -> /stocks 查询字符串（筛选在服务端完成）
+const buildStockParams = (filters = {}, { sort, order, offset, limit } = {}) => {
+  const params = new URLSearchParams();
+  const { year, annual_return, max_drawdown, pe_ratio, pb_ratio, sharpe_ratio, code } = filters;
+  if (year && year !== '选择年份') params.append("year", year);
+  // code 可为数组（如联想搜索匹配到的多只股票）
+  [].concat(code ?? []).forEach((c) => params.append("code", c));
+  Object.entries({ annual_return, max_drawdown, pe_ratio, pb_ratio, sharpe_ratio, sort, order, offset, limit })
+    .forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== "") params.append(key, value);
+    });
+  return params;
+};
+
 /**
  * 获取股票列表并应用过滤器
  * @param {Object} filters - 过滤条件
+ * @param {Object} page - 排序与分页 { sort, order, offset, limit }
  * @returns {Promise<StockItem[]>} 股票列表
  */
-export async function fetchStocks(filters = {}) {
+export async function fetchStocks(filters = {}, page = {}) {
   try {
-    const allItems = await apiRequest(`${API_BASE_URL}/stocks`);
-
-    // 应用过滤器
-    const filteredItems = allItems.filter(item => {
-      if (filters.year && filters.year !== '选择年份' && item["年份"] != filters.year) {
-        return false;
-      }
-
-      const annualReturn = parseFloat(item["年涨跌幅"]);
-      const maxDrawdown = parseFloat(item["最大回撤"]);
-      const peRatio = parseFloat(item["市盈率"]);
-      const pbRatio = parseFloat(item["市净率"]);
-      const sharpeRatio = parseFloat(item["夏普比率-普通收益率-日-一年定存利率"]);
-
-      if (filters.annual_return !== undefined && !isNaN(annualReturn) && annualReturn < parseFloat(filters.annual_return)) return false;
-      if (filters.max_drawdown !== undefined && !isNaN(maxDrawdown) && maxDrawdown > parseFloat(filters.max_drawdown)) return false;
-      if (filters.pe_ratio !== undefined && !isNaN(peRatio) && peRatio > parseFloat(filters.pe_ratio)) return false;
-      if (filters.pb_ratio !== undefined && !isNaN(pbRatio) && pbRatio > parseFloat(filters.pb_ratio)) return false;
-      if (filters.sharpe_ratio !== undefined && !isNaN(sharpeRatio) && sharpeRatio < parseFloat(filters.sharpe_ratio)) return false;
-      
-      return true;
-    });
-
-    // 映射到前端结构
-    return filteredItems.map(item => ({
-      code: item["证券代码"],
-      name: item["证券名称"],
-      year: Number(item["年份"]),
-      annual_return: parseFloat(item["年涨跌幅"]),
-      max_drawdown: parseFloat(item["最大回撤"]),
-      pe_ratio: parseFloat(item["市盈率"]),
-      pb_ratio: parseFloat(item["市净率"]),
-      sharpe_ratio: parseFloat(item["夏普比率-普通收益率-日-一年定存利率"])
-    }));
+    const params = buildStockParams(filters, page);
+    const items = await apiRequest(`${API_BASE_URL}/stocks?${params}`);
+    return items.map(mapStockItem);
 
   } catch (error) {
     handleApiError(error, "fetchStocks");
@@ -77,6 +73,27 @@ export async function fetchStocks(filters = {}) {
   }
 }
 
+/**
+ * 分页获取股票列表（筛选、排序、分页均在服务端完成）
+ * @param {Object} filters - 过滤条件，同 fetchStocks
+ * @param {Object} page - 排序与分页 { sort, order, offset, limit }
+ * @returns {Promise<{items: StockItem[], total: number}>} 当前页与满足条件的总条数（X-Total-Count）
+ */
+export async function fetchStocksPage(filters = {}, page = {}) {
+  try {
+    const params = buildStockParams(filters, page);
+    const response = await fetch(`${API_BASE_URL}/stocks?${params}`);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${await response.text()}`);
+    }
+    const items = (await response.json()).map(mapStockItem);
+    return { items, total: Number(response.headers.get("X-Total-Count") ?? items.length) };
+  } catch (error) {
+    handleApiError(error, "fetchStocksPage");
+    return { items: [], total: 0 };
+  }
+}
+
 /**
  * 获取单个股票的基本信息
  * @param {string} code - 股票代码
@@ -85,28 +102,15 @@ export async function fetchStocks(filters = {}) {
  */
 export async function fetchStockInfo(code, year) {
   try {
-    const allItems = await apiRequest(`${API_BASE_URL}/stocks`);
-    
-    const stockInfo = allItems.find(item => 
-      item["证券代码"] === code && 
-      Number(item["年份"]) === Number(year)
-    );
-    
-    if (!stockInfo) {
+    const params = buildStockParams({ code, year }, { limit: 1 });
+    const items = await apiRequest(`${API_BASE_URL}/stocks?${params}`);
+
+    if (!items.length) {
       console.warn(`Stock with code ${code} and year ${year} not found`);
       return null;
     }
 
-    return {
-      code: stockInfo["证券代码"],
-      name: stockInfo["证券名称"],
-      year: Number(stockInfo["年份"]),
-      annual_return: parseFloat(stockInfo["年涨跌幅"]),
-      max_drawdown: parseFloat(stockInfo["最大回撤"]),
-      pe_ratio: parseFloat(stockInfo["市盈率"]),
-      pb_ratio: parseFloat(stockInfo["市净率"]),
-      sharpe_ratio: parseFloat(stockInfo["夏普比率-普通收益率-日-一年定存利率"])
-    };
+    return mapStockItem(items[0]);
 
   } catch (error) {
     handleApiError(error, "fetchStockInfo");
@@ -114,14 +118,41 @@ export async function fetchStockInfo(code, year) {
   }
 }
 
+/**
+ * 股票联想搜索（代码 / 名称 / 拼音首字母）
+ * @param {string} q - 输入内容，如 "600000"、"sh.6000"、"浦发"、"pfyh"
+ * @param {number} limit - 最多返回条数
+ * @returns {Promise<Array<{code: string, kline_code: string, name: string, match: string}>>} 匹配结果
+ */
+export async function searchStocks(q, limit = 10) {
+  try {
+    const params = new URLSearchParams({ q, limit });
+    return await apiRequest(`${API_BASE_URL}/search?${params}`);
+  } catch (error) {
+    handleApiError(error, "searchStocks");
+    return [];
+  }
+}
+
 /**
  * 获取股票K线数据
  * @param {string} code - 股票代码
+ * @param {Object} options - 可选参数
+ * @param {string} options.period - K线周期 D/W/M/Q/Y（服务端聚合，默认日K）
+ * @param {string} options.start - 起始日期 YYYY-MM-DD（含）
+ * @param {string} options.end - 结束日期 YYYY-MM-DD（含），向前翻页时传入已加载的最早日期前一天
+ * @param {number} options.limit - 只取最近 N 根
+ * @param {string} options.since - 只取该日期之后新增的K线（轮询增量）
+ * @param {number} options.max_points - 服务端降采样后的最大根数（通常取图表像素宽度）
  * @returns {Promise<{kline_data: KlineItem[]}}>} K线数据
  */
-export async function fetchStockDetail(code) {
+export async function fetchStockDetail(code, { period = "D", start, end, limit, since, max_points } = {}) {
   try {
-    const kline_data = await apiRequest(`${API_BASE_URL}/kline/${code}`);
+    const params = new URLSearchParams({ period });
+    Object.entries({ start, end, limit, since, max_points }).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) params.append(key, value);
+    });
+    const kline_data = await apiRequest(`${API_BASE_URL}/kline/${code}?${params}`);
     return { kline_data };
   } catch (error) {
     handleApiError(error, "fetchStockDetail");
@@ -129,6 +160,45 @@ export async function fetchStockDetail(code) {
   }
 }
 
+/**
+ * 批量获取多只股票K线（一次请求、一次扫描）
+ * @param {string[]} codes - 股票代码列表，支持 600000 / sh.600000 / 600000.SH 等格式
+ * @param {Object} options - 可选参数 { period, start, end, max_points }
+ * @returns {Promise<{period: string, data: Object<string, Object>, missing: string[]}>} 按代码分组的列式K线
+ */
+export async function fetchKlineBatch(codes, { period = "D", start, end, max_points } = {}) {
+  try {
+    return await apiRequest(`${API_BASE_URL}/kline/batch`, {
+      method: "POST",
+      body: JSON.stringify({ codes, period, start, end, max_points })
+    });
+  } catch (error) {
+    handleApiError(error, "fetchKlineBatch");
+    return { period, data: {}, missing: codes };
+  }
+}
+
+/**
+ * 获取技术指标（服务端计算并缓存）
+ * @param {string} code - 股票代码
+ * @param {Object} options - 可选参数
+ * @param {string} options.names - 逗号分隔的指标，如 "ma5,ma10,ma20,macd,rsi14,boll20,atr14"
+ * @param {string} options.period - K线周期 D/W/M/Q/Y
+ * @returns {Promise<Object[]>} 每个交易日一行的指标数据
+ */
+export async function fetchIndicators(code, { names = "ma5,ma10,ma20", period = "D", start, end, limit } = {}) {
+  try {
+    const params = new URLSearchParams({ names, period });
+    Object.entries({ start, end, limit }).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) params.append(key, value);
+    });
+    return await apiRequest(`${API_BASE_URL}/indicators/${code}?${params}`);
+  } catch (error) {
+    handleApiError(error, "fetchIndicators");
+    return [];
+  }
+}
+
 /**
  * 获取用户列表
  * @returns {Promise<Array>} 用户列表
@@ -142,16 +212,49 @@ export async function fetchUsers() {
   }
 }
 
+// 订单簿筛选条件 -> 查询字符串
+const buildOrderBookParams = ({ user, code, start, end, result, order, cursor, limit } = {}) => {
+  const params = new URLSearchParams();
+  Object.entries({ user, code, start, end, result, order, cursor, limit }).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== "") params.append(key, value);
+  });
+  return params;
+};
+
 /**
- * 获取订单簿数据
+ * 获取订单簿数据（按游标逐页拉取，每次请求最多 limit 行）
+ * @param {Object} filters - 筛选条件 { user, code, start, end, result }，筛选在服务端完成
+ * @param {Object} options - { limit, maxRows }，maxRows 为最多拉取的总行数（默认不限）
  * @returns {Promise<OrderBookItem[]>} 订单簿列表
  */
-export async function fetchOrderBook() {
+export async function fetchOrderBook(filters = {}, { limit = 1000, maxRows = Infinity } = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await fetchOrderBookPage(filters, { cursor, limit });
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor && items.length < maxRows);
+  return items.slice(0, maxRows);
+}
+
+/**
+ * 分页获取订单簿数据（游标分页）
+ * @param {Object} filters - 筛选条件，同 fetchOrderBook
+ * @param {Object} page - { cursor, limit, order }，cursor 取上一页返回的 nextCursor
+ * @returns {Promise<{items: OrderBookItem[], nextCursor: string|null}>} 当前页与下一页游标（没有下一页时为 null）
+ */
+export async function fetchOrderBookPage(filters = {}, { cursor, limit = 1000, order } = {}) {
   try {
-    return await apiRequest(`${API_BASE_URL}/order_book`);
+    const params = buildOrderBookParams({ ...filters, cursor, limit, order });
+    const response = await fetch(`${API_BASE_URL}/order_book?${params}`);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${await response.text()}`);
+    }
+    return { items: await response.json(), nextCursor: response.headers.get("X-Next-Cursor") };
   } catch (error) {
-    handleApiError(error, "fetchOrderBook");
-    return [];
+    handleApiError(error, "fetchOrderBookPage");
+    return { items: [], nextCursor: null };
   }
 }
 
@@ -183,6 +286,17 @@ export async function sendChat({ message, history = [], stock_id = null, endpoin
   }
 }
 
+/**
+ * 生成服务端会话 ID（非安全上下文下没有 crypto.randomUUID 时退化为时间戳 + 随机数）
+ * @returns {string}
+ */
+export function newConversationId() {
+  if (globalThis.crypto?.randomUUID) {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
 /**
  * 发送流式聊天消息
  * @param {Object} params - 聊天参数
@@ -190,12 +304,13 @@ export async function sendChat({ message, history = [], stock_id = null, endpoin
  * @param {ChatMessage[]} params.history - 聊天历史
  * @param {string|null} params.stock_id - 股票ID
  * @param {string} params.endpoint - 聊天端点 ('stock' 或 'strategy')
+ * @param {string|null} params.conversation_id - 服务端会话 ID，提供时历史由服务端维护，无需上传 history
  * @param {function} params.onChunk - 接收数据块的回调函数
  * @param {function} params.onError - 错误处理回调函数
  * @param {function} params.onComplete - 完成时的回调函数
  * @returns {Promise<void>}
  */
-export async function sendChatStream({ message, history = [], stock_id = null, year = null, endpoint = "stock", onChunk, onError, onComplete }) {
+export async function sendChatStream({ message, history = [], stock_id = null, year = null, endpoint = "stock", conversation_id = null, onChunk, onError, onComplete }) {
   try {
     const validEndpoints = ["stock", "strategy"];
     if (!validEndpoints.includes(endpoint)) {
@@ -207,9 +322,18 @@ export async function sendChatStream({ message, history = [], stock_id = null, y
       headers: {
         "Content-Type": "application/json"
       },
-      body: JSON.stringify({ message, history, stock_id, year })
+      body: JSON.stringify(
+        conversation_id
+          ? { message, stock_id, year, conversation_id }
+          : { message, history, stock_id, year }
+      )
     });
 
+    if (response.status === 429) {
+      // 服务端排队已满，按 Retry-After 提示用户稍后重试
+      const retryAfter = response.headers.get("Retry-After") || "几";
+      throw new Error(`AI 服务繁忙，请 ${retryAfter} 秒后重试`);
+    }
     if (!response.ok || !response.body) {
       throw new Error(`HTTP ${response.status}: ${await response.text()}`);
     }
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useTheme } from '../context/ThemeContext';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
-import { sendChatStream } from '../api/api';
+import { newConversationId, sendChatStream } from '../api/api';
 
 export default function AIChatAssistant({
   endpoint = "stock",
@@ -26,6 +26,8 @@ export default function AIChatAssistant({
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
   const textareaRef = useRef(null);
+  // 服务端会话 ID：历史由后端保存并自动摘要，每次只发送新消息
+  const conversationIdRef = useRef(newConversationId());
 
   // 颜色定义
   const colors = {
@@ -71,6 +73,7 @@ export default function AIChatAssistant({
 
   // 当contextId或initialMessage变化时重置消息
   useEffect(() => {
+    conversationIdRef.current = newConversationId();
     if (contextId && initialMessage) {
       setMessages([{ role: 'ai', content: initialMessage }]);
     } else if (contextId) {
@@ -102,22 +105,13 @@ export default function AIChatAssistant({
     let aiText = '';
 
     try {
-      // 准备聊天历史
-      const trimmedHistory = currentHistory
-        .filter(msg => msg.role === 'user' || msg.role === 'ai')
-        .slice(-6)
-        .map(msg => ({
-          role: msg.role === 'user' ? 'user' : 'assistant',
-          content: msg.content,
-        }));
-
-      // 使用流式API
+      // 使用流式API，聊天历史由服务端按会话 ID 维护
       await sendChatStream({
         message: currentInputValue,
-        history: trimmedHistory.slice(0, -1),
         stock_id: contextId,
         year: year,
         endpoint: endpoint,
+        conversation_id: conversationIdRef.current,
         onChunk: (chunk) => {
           aiText += chunk;
           setMessages(prev => {
@@ -4,7 +4,7 @@ import { useTheme } from '../context/ThemeContext';
 
 export default function StockList({ 
   displayStocks, 
-  filteredStocks, 
+  totalCount, 
   sortConfig, 
   handleSort, 
   handleScroll,
@@ -93,7 +93,7 @@ export default function StockList({
                 股票列表
               </h2>
               <p className={`${colors.textMuted} text-sm`}>
-                共 {filteredStocks.length} 条记录
+                共 {totalCount} 条记录
               </p>
             </div>
           </div>
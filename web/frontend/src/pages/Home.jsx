@@ -1,17 +1,23 @@
-import React, { useState, useEffect, useMemo } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { fetchStocks } from "../api/api";
+import { fetchStocksPage, searchStocks } from "../api/api";
 import { useTheme } from "../context/ThemeContext";
 import StockList from "../components/StockList";
 import FilterPanel from "../components/FilterPanel";
 
+const PAGE_SIZE = 50;
+const SEARCH_LIMIT = 50; // 与 /api/search 的上限一致
+
 export default function Home() {
-  const [allStocks, setAllStocks] = useState([]);
-  const [displayStocks, setDisplayStocks] = useState([]);
-  const [displayCount, setDisplayCount] = useState(50);
-  
+  // 已加载的行（按页追加）与服务端返回的总条数
+  const [stocks, setStocks] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [loading, setLoading] = useState(false);
+  const requestId = useRef(0); // 条件变化后丢弃旧请求的结果
+
   // 分离搜索文本和其他筛选条件
   const [searchText, setSearchText] = useState(""); // 实时搜索文本
+  const [searchCodes, setSearchCodes] = useState(null); // 搜索匹配到的证券代码，null 表示不按代码过滤
   const [filters, setFilters] = useState({
     year: "",
     annual_return: 0,
@@ -72,13 +78,56 @@ export default function Home() {
       : "shadow-xl shadow-gray-500/30",
   };
 
+  // 输入停顿 300ms 后通过联想搜索（代码 / 名称 / 拼音首字母前缀）解析出匹配的代码
   useEffect(() => {
-    async function load() {
-      const data = await fetchStocks({});
-      setAllStocks(data);
+    const text = searchText.trim();
+    if (!text) {
+      setSearchCodes(null);
+      return;
     }
-    load();
-  }, []);
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      const matches = await searchStocks(text, SEARCH_LIMIT);
+      if (!cancelled) setSearchCodes(matches.map((m) => m.code));
+    }, 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchText]);
+
+  // 筛选 / 排序条件 -> /stocks 查询参数；与原逻辑一致，全部为默认值时不过滤数值条件
+  const queryFilters = () => {
+    const active = hasActiveFilters() ? filters : {};
+    return { ...active, code: searchCodes ?? undefined };
+  };
+
+  const loadPage = async (offset) => {
+    const id = ++requestId.current;
+    if (searchCodes && !searchCodes.length) {
+      // 搜索没有匹配时无需请求列表
+      setStocks([]);
+      setTotal(0);
+      setLoading(false);
+      return;
+    }
+    setLoading(true);
+    const { items, total } = await fetchStocksPage(queryFilters(), {
+      sort: sortConfig.key || undefined,
+      order: sortConfig.direction,
+      offset,
+      limit: PAGE_SIZE,
+    });
+    if (id !== requestId.current) return;
+    setStocks((prev) => (offset === 0 ? items : [...prev, ...items]));
+    setTotal(total);
+    setLoading(false);
+  };
+
+  // 条件变化时从第一页重新加载
+  useEffect(() => {
+    loadPage(0);
+  }, [filters, searchCodes, sortConfig]);
 
   const onFilterChange = (key, value) => {
     if (key === "search_text") {
@@ -142,64 +191,11 @@ export default function Home() {
     );
   };
 
-  const filteredStocks = useMemo(() => {
-    setDisplayCount(50);
-    return allStocks.filter((item) => {
-      // 首先应用搜索文本筛选（实时）
-      if (searchText) {
-        const searchTerm = searchText.toLowerCase();
-        const codeMatch = item.code.toLowerCase().includes(searchTerm);
-        const nameMatch = item.name.toLowerCase().includes(searchTerm);
-        if (!codeMatch && !nameMatch) {
-          return false;
-        }
-      }
-
-      // 只有当有活跃筛选条件时才应用其他筛选
-      if (hasActiveFilters()) {
-        if (filters.year && String(item.year) !== String(filters.year))
-          return false;
-        if (Number(item.annual_return) < filters.annual_return) return false;
-        if (Number(item.max_drawdown) > filters.max_drawdown) return false;
-        if (Number(item.pe_ratio) > filters.pe_ratio) return false;
-        if (Number(item.pb_ratio) > filters.pb_ratio) return false;
-        if (Number(item.sharpe_ratio) < filters.sharpe_ratio) return false;
-      }
-      
-      return true;
-    });
-  }, [allStocks, searchText, filters]);
-
-  const sortedStocks = useMemo(() => {
-    if (!sortConfig.key) return filteredStocks;
-    return [...filteredStocks].sort((a, b) => {
-      const aVal = a[sortConfig.key];
-      const bVal = b[sortConfig.key];
-      if (aVal == null || bVal == null) return 0;
-      const aNum = parseFloat(aVal);
-      const bNum = parseFloat(bVal);
-      if (
-        sortConfig.key !== "code" &&
-        sortConfig.key !== "name" &&
-        !isNaN(aNum) &&
-        !isNaN(bNum)
-      ) {
-        return sortConfig.direction === "asc" ? aNum - bNum : bNum - aNum;
-      }
-      return sortConfig.direction === "asc"
-        ? String(aVal).localeCompare(String(bVal))
-        : String(bVal).localeCompare(String(aVal));
-    });
-  }, [filteredStocks, sortConfig]);
-
-  useEffect(() => {
-    setDisplayStocks(sortedStocks.slice(0, displayCount));
-  }, [sortedStocks, displayCount]);
-
+  // 滚动到底部时加载下一页
   const handleScroll = (e) => {
     const { scrollTop, scrollHeight, clientHeight } = e.target;
-    if (scrollTop + clientHeight >= scrollHeight - 50) {
-      setDisplayCount((prev) => Math.min(prev + 50, sortedStocks.length));
+    if (scrollTop + clientHeight >= scrollHeight - 50 && !loading && stocks.length < total) {
+      loadPage(stocks.length);
     }
   };
 
@@ -278,8 +274,8 @@ export default function Home() {
 
         {/* 右侧股票列表面板 */}
         <StockList
-          displayStocks={displayStocks}
-          filteredStocks={filteredStocks}
+          displayStocks={stocks}
+          totalCount={total}
           sortConfig={sortConfig}
           handleSort={handleSort}
           handleScroll={handleScroll}
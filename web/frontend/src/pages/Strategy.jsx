@@ -125,11 +125,24 @@ export default function Strategy() {
         setFilteredUsers(data);
       })
       .catch(err => console.error('获取用户数据失败:', err));
+  }, []);
 
-    fetchOrderBook()
-      .then(data => setOrderBook(data))
+  // 只拉取选中用户的订单（服务端筛选 + 分页）
+  useEffect(() => {
+    if (!selectedUser) {
+      setOrderBook([]);
+      return;
+    }
+    let cancelled = false;
+    fetchOrderBook({ user: selectedUser })
+      .then(data => {
+        if (!cancelled) setOrderBook(data);
+      })
       .catch(err => console.error('获取订单数据失败:', err));
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedUser]);
 
   const handleFilter = () => {
     const result = users.filter(